@@ -0,0 +1,136 @@
+from typing import Iterator, Optional
+
+import numpy as np
+
+from board import neighbour_table
+from cycle import cycle_index
+
+
+class BatchGames:
+    # many games on one board size, held as arrays and stepped in lockstep with the policy of get_next_direction_cycle.
+    # cells use the board's column-major ids, bodies are ring buffers with the head at head_slot.
+
+    def __init__(self, count: int, width: int, height: int, rng: np.random.Generator):
+        size = width * height
+        self.count = count
+        self.width = width
+        self.height = height
+        self.size = size
+        self.rng = rng
+
+        self.cycle_index = np.asarray(cycle_index(width, height), dtype=np.int64)
+        # the board's neighbour table, a column per direction code (down, up, right, left). -1 marks a wall.
+        neighbors = np.frombuffer(neighbour_table(width, height), dtype=np.int32).reshape(size, 4).astype(np.int64)
+        self.neighbors = np.where(neighbors == np.arange(size)[:, None], -1, neighbors)
+
+        self.occupied = np.zeros((count, size), dtype=bool)
+        self.body = np.zeros((count, size), dtype=np.int64)
+        self.head_slot = np.zeros(count, dtype=np.int64)
+        self.length = np.zeros(count, dtype=np.int64)
+        self.fruit = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.steps = np.zeros(count, dtype=np.int64)
+        self.steps_since_last_fruit = np.zeros(count, dtype=np.int64)
+        self.done = np.zeros(count, dtype=bool)
+        self.won = np.zeros(count, dtype=bool)
+
+        # the opening snake of init_game_state, head first
+        term_width = width + 2
+        term_height = height + 2
+        for i in range(3):
+            cell = (term_width // 2 - i - 1) * height + (term_height // 2 - 1)
+            self.body[:, i] = cell
+            self.occupied[:, cell] = True
+        self.length[:] = 3
+        self._spawn_fruit(np.arange(count))
+
+    def _spawn_fruit(self, games: np.ndarray):
+        # rejection sampling while the boards are sparse, an exact draw over the free cells for whatever is left
+        for _ in range(8):
+            if games.size == 0:
+                return
+            cells = self.rng.integers(0, self.size, games.size)
+            free = ~self.occupied[games, cells]
+            self.fruit[games[free]] = cells[free]
+            games = games[~free]
+        for game in games:
+            free_cells = np.flatnonzero(~self.occupied[game])
+            self.fruit[game] = free_cells[self.rng.integers(free_cells.size)]
+
+    def step(self) -> int:
+        # advances every running game by one move and returns how many were running
+        active = np.flatnonzero(~self.done)
+        if active.size == 0:
+            return 0
+        size = self.size
+        rows = np.arange(active.size)
+
+        head_slot = self.head_slot[active]
+        length = self.length[active]
+        head = self.body[active, head_slot]
+        tail = self.body[active, (head_slot + length - 1) % size]
+        fruit = self.fruit[active]
+
+        head_index = self.cycle_index[head]
+        tail_gap = (self.cycle_index[tail] - head_index) % size
+        fruit_gap = (self.cycle_index[fruit] - head_index) % size
+        neighbors = self.neighbors[head]
+        gap = (self.cycle_index[neighbors] - head_index[:, None]) % size
+        allowed = (neighbors >= 0) & (gap > 0) & (gap < tail_gap[:, None])
+        shortcut = (fruit_gap < tail_gap)[:, None] & (fruit_gap[:, None] - gap >= length[:, None])
+        gap = np.where(allowed & ((gap == 1) | shortcut), gap, -1)
+        choice = gap.argmax(axis=1)
+        new_head = neighbors[rows, choice]
+
+        # like cli_game_loop, the move that ends a game still counts as a step
+        self.steps[active] += 1
+        stuck = gap[rows, choice] < 0
+        self.done[active[stuck]] = True
+
+        moving = ~stuck
+        games = active[moving]
+        new_head = new_head[moving]
+        eat = new_head == fruit[moving]
+
+        # the tail leaves first unless the snake grows
+        shrinking = games[~eat]
+        self.occupied[shrinking, tail[moving][~eat]] = False
+        self.length[shrinking] -= 1
+
+        collided = self.occupied[games, new_head]
+        self.done[games[collided]] = True
+        games = games[~collided]
+        new_head = new_head[~collided]
+        eat = eat[~collided]
+
+        self.head_slot[games] = (self.head_slot[games] - 1) % size
+        self.body[games, self.head_slot[games]] = new_head
+        self.occupied[games, new_head] = True
+        self.length[games] += 1
+
+        eaters = games[eat]
+        self.score[eaters] += 1
+        self.steps_since_last_fruit[games] += 1
+        self.steps_since_last_fruit[eaters] = 0
+
+        full = self.length[eaters] == size
+        self.done[eaters[full]] = True
+        self.won[eaters[full]] = True
+        self.steps[eaters[full]] += 1
+        self._spawn_fruit(eaters[~full])
+
+        live_lock = games[self.steps_since_last_fruit[games] > size * 2]
+        self.done[live_lock] = True
+        return active.size
+
+    def run(self) -> "BatchGames":
+        while self.step():
+            pass
+        return self
+
+
+def play_batches(runs: int, batch_size: int, width: int, height: int, seed: Optional[int] = None) -> Iterator[BatchGames]:
+    # plays runs games in lockstep chunks of batch_size and yields each finished chunk
+    rng = np.random.default_rng(seed)
+    for start in range(0, runs, batch_size):
+        yield BatchGames(min(batch_size, runs - start), width, height, rng).run()
@@ -0,0 +1,169 @@
+import csv
+import json
+import multiprocessing
+import random
+import resource
+import statistics
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from snake import cli_game_loop, init_game_state
+from solver import SOLVERS, warm_up
+
+FIELDS = ("size", "solver", "seed", "steps", "won", "steps_to_win", "time_per_step", "decisions_per_second", "p50_latency", "p95_latency", "p99_latency", "peak_memory_kb")
+LOWER_IS_BETTER = ("steps_to_win", "time_per_step", "p50_latency", "p95_latency", "p99_latency", "peak_memory_kb")
+HIGHER_IS_BETTER = ("decisions_per_second",)
+
+
+def measure(size: int, solver: str, seed: int, max_steps: Optional[int]) -> Dict[str, object]:
+    # plays one seeded game and times every call into the solver, in cpu time of this thread so that
+    # other processes on the machine do not show up as regressions. every game runs in a fresh process,
+    # so the tables are built and one move is made on a throwaway game first, which keeps the cold
+    # start out of the latencies.
+    decide = SOLVERS[solver]
+    warm_up(size - 2, size - 2)
+    decide(init_game_state(size, size, random.Random(seed)))
+    latencies: List[float] = []
+
+    def timed_solver(game):
+        start = time.thread_time()
+        direction = decide(game)
+        latencies.append(time.thread_time() - start)
+        return direction
+
+    rng = random.Random(seed)
+    start = time.thread_time()
+    final_game_state, steps = cli_game_loop(init_game_state(size, size, rng), timed_solver, max_steps, rng=rng)
+    elapsed = time.thread_time() - start
+
+    won = len(final_game_state.snake) == (size - 2) * (size - 2)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "size": size,
+        "solver": solver,
+        "seed": seed,
+        "steps": steps,
+        "won": won,
+        "steps_to_win": steps if won else None,
+        "time_per_step": elapsed / steps,
+        "decisions_per_second": len(latencies) / sum(latencies),
+        "p50_latency": cuts[49],
+        "p95_latency": cuts[94],
+        "p99_latency": cuts[98],
+        # ru_maxrss is in kilobytes on linux
+        "peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def _measure_task(config: Tuple[int, str, int, Optional[int]]) -> Dict[str, object]:
+    return measure(*config)
+
+
+def _parse(value: str) -> object:
+    # csv hands back strings, turn them into what measure() produced
+    if value == "":
+        return None
+    if value in ("True", "False"):
+        return value == "True"
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return value
+
+
+def save_results(path: str, results: Sequence[Dict[str, object]]):
+    with open(path, "w", newline="") as f:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+        else:
+            json.dump(list(results), f, indent=2)
+
+
+def load_results(path: str) -> List[Dict[str, object]]:
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            return [{key: _parse(value) for key, value in row.items()} for row in csv.DictReader(f)]
+        return json.load(f)
+
+
+def summarize(results: Sequence[Dict[str, object]]) -> List[Dict[str, object]]:
+    # one record per board size and solver: games won and the mean steps to win across the seeds
+    groups: Dict[Tuple[int, str], List[Dict[str, object]]] = {}
+    for record in results:
+        groups.setdefault((record["size"], record["solver"]), []).append(record)
+    summary = []
+    for (size, solver), records in groups.items():
+        wins = [record["steps_to_win"] for record in records if record["won"]]
+        summary.append({"size": size, "solver": solver, "games": len(records), "wins": len(wins), "mean_steps_to_win": statistics.fmean(wins) if wins else None})
+    return summary
+
+
+def _medians(results: Sequence[Dict[str, object]]) -> Dict[Tuple[int, str], Dict[str, object]]:
+    # per board size and solver: games, wins and the median of every metric across the seeds
+    groups: Dict[Tuple[int, str], List[Dict[str, object]]] = {}
+    for record in results:
+        groups.setdefault((record["size"], record["solver"]), []).append(record)
+    medians = {}
+    for key, records in groups.items():
+        medians[key] = {"games": len(records), "wins": sum(bool(record["won"]) for record in records)}
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            values = [record[metric] for record in records if record.get(metric) is not None]
+            medians[key][metric] = statistics.median(values) if values else None
+    return medians
+
+
+def compare(results: Sequence[Dict[str, object]], baseline: Sequence[Dict[str, object]], threshold: float) -> List[str]:
+    # returns one line per board size, solver and metric whose median across the seeds got worse
+    # than the baseline's by more than threshold. single games are too noisy to compare one by one.
+    previous = _medians(baseline)
+    regressions = []
+    for (size, solver), current in _medians(results).items():
+        old = previous.get((size, solver))
+        if old is None:
+            continue
+        name = f"{size}x{size} {solver}"
+        if current["wins"] * old["games"] < old["wins"] * current["games"]:
+            regressions.append(f"{name}: won {current['wins']}/{current['games']} games, {old['wins']}/{old['games']} before")
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            before = old[metric]
+            after = current[metric]
+            if before is None or after is None or before == 0:
+                continue
+            change = (after - before) / before
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append(f"{name}: median {metric} {before:.6g} -> {after:.6g} ({change:.0%} worse)")
+    return regressions
+
+
+def run_suite(sizes: Sequence[int], solvers: Sequence[str], seeds: Sequence[int], max_steps: Optional[int], output: str, baseline: Optional[str], threshold: float) -> int:
+    # every game runs in a fresh process, so the peak memory of one does not leak into the next
+    configs = [(size, solver, seed, max_steps) for size in sizes for solver in solvers for seed in seeds]
+    results = []
+    with multiprocessing.Pool(processes=1, maxtasksperchild=1) as pool:
+        for record in pool.imap(_measure_task, configs):
+            results.append(record)
+            won = f"won in {record['steps']} steps" if record["won"] else f"stopped after {record['steps']} steps"
+            print(f"{record['size']}x{record['size']} {record['solver']} seed {record['seed']}: {won}, {record['time_per_step'] * 1e3:.3f}ms/step, p50/p95/p99 {record['p50_latency'] * 1e3:.3f}/{record['p95_latency'] * 1e3:.3f}/{record['p99_latency'] * 1e3:.3f}ms, {record['decisions_per_second']:.0f} decisions/s, {record['peak_memory_kb']}kb peak")
+
+    for record in summarize(results):
+        mean = "never won" if record["mean_steps_to_win"] is None else f"{record['mean_steps_to_win']:.1f} mean steps to win"
+        print(f"{record['size']}x{record['size']} {record['solver']}: {record['wins']}/{record['games']} won, {mean}")
+
+    save_results(output, results)
+    print(f"results written to {output}")
+
+    if baseline is None:
+        return 0
+    regressions = compare(results, load_results(baseline), threshold)
+    for line in regressions:
+        print(f"regression: {line}")
+    if regressions:
+        return 1
+    print(f"no regressions against {baseline}")
+    return 0
@@ -0,0 +1,305 @@
+import random
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# direction codes, numbered in the order the searches try the neighbours of a cell. the terminal's
+# key names are only used at the edges, to read solver decisions and key presses.
+DOWN, UP, RIGHT, LEFT = range(4)
+DIRECTIONS: Tuple[str, ...] = ("KEY_DOWN", "KEY_UP", "KEY_RIGHT", "KEY_LEFT")
+DIRECTION_CODE: Dict[str, int] = {key: code for code, key in enumerate(DIRECTIONS)}
+
+
+def opposite(code: int) -> int:
+    return code ^ 1
+
+
+@lru_cache(maxsize=None)
+def neighbour_table(width: int, height: int) -> array:
+    # the neighbour of every cell in every direction, at cell * 4 + code. a side that faces the wall
+    # holds the cell itself, so every entry is on the board: a search never follows it, as the cell
+    # it expands is already closed, and a move along it is a move into the wall.
+    # built a column or a direction at a time, so large boards do not take a python step per cell.
+    size = width * height
+    down, up = array("i"), array("i")
+    for base in range(0, size, height):
+        down.extend(range(base + 1, base + height))
+        down.append(base + height - 1)
+        up.append(base)
+        up.extend(range(base, base + height - 1))
+    table = array("i", bytes(16 * size))
+    table[DOWN::4] = down
+    table[UP::4] = up
+    table[RIGHT::4] = array("i", range(height, size)) + array("i", range(size - height, size))
+    table[LEFT::4] = array("i", range(height)) + array("i", range(size - height))
+    return table
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(width: int, height: int) -> array:
+    # six random 64-bit keys per cell: four link keys, one per direction towards the next body cell
+    # closer to the head, then a head key and a fruit key. seeded by the board size, so all
+    # processes agree on them.
+    rng = random.Random(f"zobrist {width}x{height}")
+    return array("Q", rng.randbytes(48 * width * height))
+
+
+class Board:
+    # occupancy grid plus a ring buffer of body cells, both indexed by integer cell ids.
+    # cells are numbered column by column, so the order of ids matches the order of (x, y) tuples.
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.occupied = bytearray(self.size)
+        self.body = array("i", bytes(4 * self.size))  # head at head_slot, tail at head_slot + length - 1 (wrapping)
+        self.body_slot = array("i", bytes(4 * self.size))  # slot in body of every body cell
+        self.head_slot = 0
+        self.length = 0
+        self.moves = 0  # number of advance() calls so far
+        self.pushes = 0  # number of push_head() calls so far, see SnakeView
+        # free cells in a swap-remove array, free_slot[cell] is the cell's index into free.
+        self.free = array("i", range(self.size))
+        self.free_slot = array("i", range(self.size))
+        self.free_count = self.size
+        self.neighbours = neighbour_table(width, height)
+        # undo log of push_head and pop_tail while a checkpoint is open, see rollback()
+        self.journal: Optional[List[Tuple[int, ...]]] = None
+        # zobrist hash of the body, only kept up to date once zobrist() has been called
+        self.keys: Optional[array] = None
+        self.link_codes: Dict[int, int] = {}
+        self.hash = 0
+
+    @classmethod
+    def from_snake(cls, snake: Sequence[Tuple[int, int]], width: int, height: int) -> "Board":
+        board = cls(width, height)
+        for segment in reversed(snake):
+            board.push_head(board.cell(segment))
+        return board
+
+    def cell(self, position: Tuple[int, int]) -> int:
+        return (position[0] - 1) * self.height + (position[1] - 1)
+
+    def position(self, cell: int) -> Tuple[int, int]:
+        x, y = divmod(cell, self.height)
+        return (x + 1, y + 1)
+
+    def contains(self, position: Tuple[int, int]) -> bool:
+        return 1 <= position[0] <= self.width and 1 <= position[1] <= self.height
+
+    def is_occupied(self, position: Tuple[int, int]) -> bool:
+        return self.occupied[self.cell(position)] != 0
+
+    def step(self, cell: int, code: int) -> int:
+        # the neighbour in direction code, or cell itself when that side is the wall
+        return self.neighbours[cell * 4 + code]
+
+    def direction(self, cell: int, target: int) -> Optional[int]:
+        # the code of the move from cell to target, None unless they are neighbours
+        for code in range(4):
+            if self.neighbours[cell * 4 + code] == target != cell:
+                return code
+        return None
+
+    @property
+    def head(self) -> int:
+        return self.body[self.head_slot]
+
+    @property
+    def tail(self) -> int:
+        return self.body[(self.head_slot + self.length - 1) % self.size]
+
+    def push_head(self, cell: int):
+        if self.keys is not None:
+            keys = self.keys
+            if self.length:
+                old = self.body[self.head_slot]
+                self.hash ^= keys[old * 6 + 4] ^ keys[old * 6 + self.link_codes[cell - old]]
+            self.hash ^= keys[cell * 6 + 4]
+
+        self.head_slot = (self.head_slot - 1) % self.size
+        self.pushes += 1
+        if self.journal is not None:
+            self.journal.append((cell, self.free_slot[cell], self.body[self.head_slot], self.body_slot[cell]))
+        self.body[self.head_slot] = cell
+        self.body_slot[cell] = self.head_slot
+        self.occupied[cell] = 1
+        self.length += 1
+
+        # swap the last free cell into the slot of the one being taken
+        self.free_count -= 1
+        slot = self.free_slot[cell]
+        last = self.free[self.free_count]
+        self.free[slot] = last
+        self.free_slot[last] = slot
+        self.free[self.free_count] = cell
+        self.free_slot[cell] = self.free_count
+
+    def pop_tail(self) -> int:
+        cell = self.tail
+        if self.keys is not None:
+            if self.length > 1:
+                previous = self.body[(self.head_slot + self.length - 2) % self.size]
+                self.hash ^= self.keys[cell * 6 + self.link_codes[previous - cell]]
+            else:
+                self.hash ^= self.keys[cell * 6 + 4]
+        self.occupied[cell] = 0
+        self.length -= 1
+        if self.journal is not None:
+            self.journal.append((cell, self.free_slot[cell]))
+
+        slot = self.free_slot[cell]
+        first = self.free[self.free_count]
+        self.free[slot] = first
+        self.free_slot[first] = slot
+        self.free[self.free_count] = cell
+        self.free_slot[cell] = self.free_count
+        self.free_count += 1
+        return cell
+
+    def checkpoint(self) -> Tuple[int, int, int, int, Optional[array]]:
+        # opens an undo log if there is none, rollback(checkpoint) then undoes every move since
+        if self.journal is None:
+            self.journal = []
+        return len(self.journal), self.moves, self.pushes, self.hash, self.keys
+
+    def rollback(self, checkpoint: Tuple[int, int, int, int, Optional[array]]):
+        # undoes the pushes and pops logged since the checkpoint, newest first, down to the slots
+        # of the free list and the ring buffer, so views taken before it read the same body again.
+        # rolling back the first checkpoint closes the log.
+        mark, self.moves, self.pushes, self.hash, self.keys = checkpoint
+        journal = self.journal
+        occupied, body, body_slot, free, free_slot = self.occupied, self.body, self.body_slot, self.free, self.free_slot
+        while len(journal) > mark:
+            entry = journal.pop()
+            cell, slot = entry[0], entry[1]
+            if len(entry) == 4:  # a push: (cell, free slot, overwritten body entry, old body slot)
+                occupied[cell] = 0
+                self.length -= 1
+                body[self.head_slot] = entry[2]
+                body_slot[cell] = entry[3]
+                self.head_slot = (self.head_slot + 1) % self.size
+                moved = free[slot]
+                free[self.free_count] = moved
+                free_slot[moved] = self.free_count
+                self.free_count += 1
+            else:  # a pop: (cell, slot among the taken cells)
+                occupied[cell] = 1
+                self.length += 1
+                self.free_count -= 1
+                moved = free[slot]
+                free[self.free_count] = moved
+                free_slot[moved] = self.free_count
+            free[slot] = cell
+            free_slot[cell] = slot
+        if mark == 0:
+            self.journal = None
+
+    def offset(self, cell: int) -> int:
+        # how far a body cell is behind the head, 0 for the head and length - 1 for the tail
+        return (self.body_slot[cell] - self.head_slot) % self.size
+
+    def random_free_cell(self, rng: random.Random) -> Optional[Tuple[int, int]]:
+        # uniform over all cells not covered by the body
+        if self.free_count == 0:
+            return None
+        return self.position(self.free[rng.randrange(self.free_count)])
+
+    def advance(self, cell: int, grow: bool):
+        # the tail leaves first, so a full ring buffer never has to hold length + 1 cells.
+        if not grow:
+            self.pop_tail()
+        self.push_head(cell)
+        self.moves += 1
+
+    def cells(self) -> Iterator[int]:
+        # body cells from head to tail
+        for offset in range(self.length):
+            yield self.body[(self.head_slot + offset) % self.size]
+
+    def snake(self) -> Tuple[Tuple[int, int], ...]:
+        return tuple(self.position(cell) for cell in self.cells())
+
+    def view(self) -> "SnakeView":
+        return SnakeView(self)
+
+    def vacate_times(self) -> array:
+        # moves until each cell is free if the snake does not grow, 0 for free cells. no built-in
+        # solver uses it, it backs count_reachable_cells(timed=True), which is public for solvers
+        # loaded as module:function.
+        times = array("i", bytes(4 * self.size))
+        for offset, cell in enumerate(self.cells()):
+            times[cell] = self.length - offset
+        return times
+
+    def describes(self, snake: Sequence[Tuple[int, int]]) -> bool:
+        # whether the board still holds exactly this body. O(1) for a view, which only matches the
+        # board it was taken from before the next push, and O(length) for any other sequence.
+        if isinstance(snake, SnakeView):
+            return snake.board is self and snake.pushes == self.pushes and snake.length == self.length
+        return self.length == len(snake) and all(cell == self.cell(position) for cell, position in zip(self.cells(), snake))
+
+    def zobrist(self, fruit: Optional[Tuple[int, int]] = None) -> int:
+        # hash of the body and, if given, the fruit. the first call hashes the body from scratch,
+        # after that push_head and pop_tail update it as they go.
+        if self.keys is None:
+            self.keys = zobrist_keys(self.width, self.height)
+            self.link_codes = {-1: 0, 1: 1, -self.height: 2, self.height: 3}
+            self.hash = 0
+            previous = None
+            for cell in self.cells():
+                self.hash ^= self.keys[cell * 6 + 4] if previous is None else self.keys[cell * 6 + self.link_codes[previous - cell]]
+                previous = cell
+        if fruit is None:
+            return self.hash
+        return self.hash ^ self.keys[self.cell(fruit) * 6 + 5]
+
+
+class SnakeView(Sequence[Tuple[int, int]]):
+    # the body of a board as it was when the view was taken, head first, read from the board's ring
+    # buffer instead of copied. every push writes the new head into the slot in front of the old one,
+    # so the slots of the view are only reused once the board has seen more pushes than it had free
+    # cells when the view was taken. reading a view after that raises.
+
+    __slots__ = ("board", "head_slot", "length", "pushes")
+
+    def __init__(self, board: Board):
+        self.board = board
+        self.head_slot = board.head_slot
+        self.length = board.length
+        self.pushes = board.pushes
+
+    def _cell(self, offset: int) -> int:
+        board = self.board
+        if board.pushes - self.pushes > board.size - self.length:
+            raise ValueError("the board has moved on too far to still hold this snake")
+        return board.body[(self.head_slot + offset) % board.size]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, item: Union[int, slice]):
+        if isinstance(item, slice):
+            return tuple(self[offset] for offset in range(*item.indices(self.length)))
+        if item < 0:
+            item += self.length
+        if not 0 <= item < self.length:
+            raise IndexError("snake index out of range")
+        return self.board.position(self._cell(item))
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for offset in range(self.length):
+            yield self.board.position(self._cell(offset))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (tuple, SnakeView)):
+            return len(self) == len(other) and tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return repr(tuple(self))
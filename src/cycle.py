@@ -0,0 +1,157 @@
+import os
+import struct
+import sys
+import zlib
+from array import array
+from functools import lru_cache
+from typing import Tuple
+
+# hamiltonian cycles as flat arrays of board cell ids (column-major, see Board.cell).
+# a board has one exactly when it is at least 2x2 and has an even side. for an even width the
+# cycle runs left along the top row, then snakes down and up the columns below it, and returns up
+# the last column. an odd width with an even height uses the same layout transposed.
+# a cycle and its inverse and successor tables are cached per process and on disk, in
+# $SNAKE_CACHE_DIR or ~/.cache/snake, as building the tables takes a python step per cell.
+
+# part of the cache file names and headers, bump it whenever _generate lays cycles out differently
+CACHE_VERSION = 3
+
+# magic, version, width, height, crc32 of the tables that follow: cycle, index, successors
+_HEADER = struct.Struct("<4sIIII")
+_MAGIC = b"SNKC"
+
+Tables = Tuple[array, array, array]
+
+
+def cache_dir() -> str:
+    return os.environ.get("SNAKE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "snake")
+
+
+def _generate(width: int, height: int) -> array:
+    order = array("i")
+    if width % 2 == 0:
+        order.extend((x - 1) * height for x in range(width, 0, -1))
+        for x in range(1, width + 1):
+            column = range(1, height) if x % 2 != 0 and x < width else range(height - 1, 0, -1)
+            order.extend((x - 1) * height + y for y in column)
+    else:
+        # the even-width layout of the height x width board, with x and y swapped back. it is turned
+        # around when needed so that the middle row, where init_game_state puts the snake, runs right.
+        order.extend(cell % width * height + cell // width for cell in _generate(height, width))
+        if height // 2 % 2 != 0:
+            order.reverse()
+    return order
+
+
+def _successors(order: array) -> array:
+    successors = array("i", order)
+    for position, cell in enumerate(order):
+        successors[cell] = order[position + 1 - len(order)]
+    return successors
+
+
+def _index(order: array) -> array:
+    index = array("i", order)
+    for position, cell in enumerate(order):
+        index[cell] = position
+    return index
+
+
+def _load(path: str, width: int, height: int) -> Tables:
+    # the tables of a cache file whose header matches the board and whose checksum matches its
+    # contents, or empty arrays. the checksum runs over the whole file at once, unlike a python
+    # pass that would check the cycle cell by cell.
+    size = width * height
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            data = f.read(12 * size + 1)
+    except OSError:
+        return array("i"), array("i"), array("i")
+    if len(header) != _HEADER.size or len(data) != 12 * size or _HEADER.unpack(header) != (_MAGIC, CACHE_VERSION, width, height, zlib.crc32(data)):
+        return array("i"), array("i"), array("i")
+    tables = array("i", data)
+    if sys.byteorder != "little":
+        tables.byteswap()
+    return tables[:size], tables[size : 2 * size], tables[2 * size :]
+
+
+def _store(path: str, width: int, height: int, tables: Tables):
+    # written to a temporary file and renamed, so concurrent workers never read half a cache file
+    import tempfile
+
+    data = array("i")
+    for table in tables:
+        data.extend(table)
+    if sys.byteorder != "little":
+        data.byteswap()
+    data = data.tobytes()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, CACHE_VERSION, width, height, zlib.crc32(data)))
+            f.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        pass  # an unwritable cache only costs the next process a regeneration
+
+
+@lru_cache(maxsize=None)
+def _tables(width: int, height: int) -> Tables:
+    # the cycle, its index and its successors. a cache file that is missing, of another version or
+    # board, or whose checksum does not match is replaced by fresh tables.
+    if min(width, height) < 2 or width % 2 != 0 and height % 2 != 0:
+        raise ValueError(f"a {width}x{height} board has no hamiltonian cycle")
+    path = os.path.join(cache_dir(), f"cycle-v{CACHE_VERSION}-{width}x{height}.bin")
+    tables = _load(path, width, height)
+    if not tables[0]:
+        order = _generate(width, height)
+        tables = order, _index(order), _successors(order)
+        _store(path, width, height, tables)
+    return tables
+
+
+def hamilton_cycle(width: int, height: int) -> array:
+    # cell ids in cycle order
+    return _tables(width, height)[0]
+
+
+def cycle_index(width: int, height: int) -> array:
+    # position along the cycle, indexed by cell id
+    return _tables(width, height)[1]
+
+
+def cycle_successors(width: int, height: int) -> array:
+    # the next cell along the cycle, indexed by cell id
+    return _tables(width, height)[2]
+
+
+class DynamicCycle:
+    # a copy of the hamiltonian cycle of one board that a game can rearrange as it goes.
+    # splice(a, b, c, d) moves the stretch a' .. b (primes are successors) to between c and c', in
+    # two steps around squares of the board: the edges a -> a' and b -> b' become a -> b' and
+    # b -> a', which cuts the stretch off as a cycle of its own, then c -> c' and d -> d' become
+    # c -> d' and d -> c', which opens it at d and joins it back. a, b' and a', b must be neighbours
+    # on the board, as must c, d' and c', d, and c must come after b' going forward from a.
+
+    def __init__(self, width: int, height: int):
+        self.size = width * height
+        self.successors = array("i", cycle_successors(width, height))
+        self.index = array("i", cycle_index(width, height))
+
+    def splice(self, a: int, b: int, c: int, d: int):
+        successors = self.successors
+        index = self.index
+        first = successors[a]
+        successors[a] = successors[b]
+        successors[b] = first
+        after = successors[c]
+        successors[c] = successors[d]
+        successors[d] = after
+        position = index[a]
+        cell = successors[a]
+        while cell != after:
+            position = (position + 1) % self.size
+            index[cell] = position
+            cell = successors[cell]
@@ -0,0 +1,141 @@
+import sys
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, List, Tuple
+
+# opt-in timing for the solver's hot paths. probe() only registers a function and hands it back
+# unchanged, so nothing is measured (or slowed down) until enable() swaps timing wrappers into the
+# modules and registries that hold the probed functions. code that records extra values guards
+# the call with `if instrument.enabled`, which is one attribute lookup when switched off.
+
+enabled = False
+
+
+class Histogram:
+    # count, total and power-of-two buckets of the recorded values
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets: Dict[int, int] = defaultdict(int)
+
+    def record(self, value: float):
+        self.count += 1
+        self.total += value
+        self.buckets[int(value).bit_length()] += 1
+
+    def format_buckets(self) -> str:
+        return " ".join(f"<{1 << bucket}:{count}" for bucket, count in sorted(self.buckets.items()))
+
+
+timings: Dict[str, Histogram] = defaultdict(Histogram)  # microseconds per call, keyed by "caller > function"
+values: Dict[str, Histogram] = defaultdict(Histogram)
+counters: Dict[str, int] = defaultdict(int)
+stacks: Dict[str, float] = defaultdict(float)  # self time in microseconds per folded call stack
+
+_probes: Dict[Callable, str] = {}
+_patched: List[Tuple[dict, str, Callable]] = []
+_frames: List[List] = []  # [name, child time] of the probed calls currently running
+
+
+def probe(fn: Callable) -> Callable:
+    _probes[fn] = fn.__name__
+    return fn
+
+
+def count(name: str, amount: int = 1):
+    counters[name] += amount
+
+
+def observe(name: str, value: float):
+    values[name].record(value)
+
+
+def _timed(fn: Callable, name: str) -> Callable:
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        frame = [name, 0.0]
+        _frames.append(frame)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1e6
+            _frames.pop()
+            caller = _frames[-1] if _frames else None
+            timings[f"{caller[0]} > {name}" if caller else name].record(elapsed)
+            stacks[";".join(f[0] for f in _frames + [frame])] += elapsed - frame[1]
+            if caller:
+                caller[1] += elapsed
+
+    return wrapper
+
+
+def _holders() -> List[dict]:
+    # module namespaces, plus registries such as solver.SOLVERS in the modules that define probes
+    defining = {fn.__module__ for fn in _probes}
+    holders = []
+    for module_name, module in list(sys.modules.items()):
+        namespace = getattr(module, "__dict__", None)
+        if namespace is None:
+            continue
+        holders.append(namespace)
+        if module_name in defining:
+            holders.extend(value for value in namespace.values() if isinstance(value, dict) and value is not namespace)
+    return holders
+
+
+def enable():
+    global enabled
+    if enabled:
+        return
+    wrappers = {fn: _timed(fn, name) for fn, name in _probes.items()}
+    for holder in _holders():
+        for key, value in list(holder.items()):
+            try:
+                wrapper = wrappers.get(value)
+            except TypeError:  # unhashable values
+                continue
+            if wrapper is not None:
+                holder[key] = wrapper
+                _patched.append((holder, key, value))
+    enabled = True
+
+
+def disable():
+    global enabled
+    for holder, key, original in reversed(_patched):
+        holder[key] = original
+    _patched.clear()
+    enabled = False
+
+
+def reset():
+    timings.clear()
+    values.clear()
+    counters.clear()
+    stacks.clear()
+
+
+def summary() -> str:
+    lines = [f"{'function':<48} {'calls':>9} {'total ms':>10} {'mean us':>9}"]
+    for name, histogram in sorted(timings.items(), key=lambda item: -item[1].total):
+        lines.append(f"{name:<48} {histogram.count:>9} {histogram.total / 1e3:>10.1f} {histogram.total / histogram.count:>9.1f}")
+        lines.append(f"    us per call {histogram.format_buckets()}")
+    for name, histogram in sorted(values.items()):
+        lines.append(f"{name}: {histogram.count} samples, mean {histogram.total / histogram.count:.1f}")
+        lines.append(f"    {histogram.format_buckets()}")
+    for name, value in sorted(counters.items()):
+        lines.append(f"{name}: {value}")
+    decisions = counters.get("decisions")
+    if decisions:
+        lines.append(f"hamilton fallback rate: {counters.get('hamilton_fallbacks', 0) / decisions:.1%}")
+    return "\n".join(lines)
+
+
+def write_stacks(path: str):
+    # folded stacks ("a;b;c <microseconds>") as read by flamegraph.pl and speedscope
+    with open(path, "w") as f:
+        for stack, micros in sorted(stacks.items()):
+            f.write(f"{stack} {max(1, round(micros))}\n")
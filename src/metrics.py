@@ -0,0 +1,55 @@
+import csv
+import json
+from typing import Generator, List, NamedTuple, Optional, TextIO, TypeVar
+
+T = TypeVar("T")
+
+
+class EventSink:
+    # writes per-step events as json lines, or as csv if the path ends in .csv. events are held in a
+    # buffer of at most buffer_size rows, so arbitrarily long runs stream to disk in constant memory.
+
+    def __init__(self, path: str, buffer_size: int = 8192):
+        self.file: TextIO = open(path, "w", newline="")
+        self.csv = path.endswith(".csv")
+        self.writer = csv.writer(self.file) if self.csv else None
+        self.buffer_size = buffer_size
+        self.rows: List[tuple] = []
+        self.fields: Optional[tuple] = None
+        self.written = 0
+
+    def write(self, run: int, event: NamedTuple):
+        if self.fields is None:
+            self.fields = ("run",) + event._fields
+            if self.writer is not None:
+                self.writer.writerow(self.fields)
+        self.rows.append((run,) + tuple(event))
+        if len(self.rows) >= self.buffer_size:
+            self.flush()
+
+    def write_game(self, run: int, events: Generator[NamedTuple, None, T]) -> T:
+        # drains a game's event stream into the sink and hands back what the stream returns
+        while True:
+            try:
+                event = next(events)
+            except StopIteration as finished:
+                return finished.value
+            self.write(run, event)
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.writerows(self.rows)
+        else:
+            self.file.write("".join(json.dumps(dict(zip(self.fields, row))) + "\n" for row in self.rows))
+        self.written += len(self.rows)
+        self.rows.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self) -> "EventSink":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
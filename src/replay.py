@@ -0,0 +1,123 @@
+import struct
+from array import array
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from state import GameState
+
+# a replay file is a header followed by chunks. every chunk holds a run of moves packed four to a
+# byte (2-bit direction codes) and the fruits that appeared during those moves as (step, x, y).
+# step 0 is the opening fruit, step n is the fruit spawned by the n-th move.
+
+MAGIC = b"SNKR"
+VERSION = 1
+# the 2-bit direction codes are part of the version 1 file format and differ from board.DIRECTION_CODE.
+# they are frozen: renumbering them would misread every recorded file, so it needs a new VERSION.
+DIRECTION_KEYS: Tuple[str, ...] = ("KEY_UP", "KEY_DOWN", "KEY_LEFT", "KEY_RIGHT")
+DIRECTION_CODES: Dict[str, int] = {key: code for code, key in enumerate(DIRECTION_KEYS)}
+
+_HEADER = struct.Struct("<4sBBqHHB")  # magic, version, has seed, seed, term width, term height, first direction
+_CHUNK = struct.Struct("<II")  # moves, fruits
+
+
+class Recorder:
+    # buffers moves in a bytearray and fruits in an array, and writes them out one chunk at a time
+
+    CHUNK_MOVES = 1 << 16  # a multiple of 4, so only the last chunk ends on a partly filled byte
+
+    def __init__(self, path: str, game: GameState, seed: Optional[int], solver: str):
+        self.file: BinaryIO = open(path, "wb")
+        name = solver.encode()
+        self.file.write(_HEADER.pack(MAGIC, VERSION, seed is not None, seed or 0, game.term_width, game.term_height, DIRECTION_CODES[game.direction]))
+        self.file.write(struct.pack("<B", len(name)) + name)
+        self.file.write(struct.pack("<I", len(game.snake)) + array("H", [c for segment in game.snake for c in segment]).tobytes())
+        self.moves = bytearray()
+        self.fruits = array("I", (0, game.fruit[0], game.fruit[1]))
+        self.chunk_moves = 0
+        self.steps = 0
+
+    def record(self, game: GameState, ate: bool):
+        # game is the state right after a move, ate tells whether that move grew the snake
+        code = DIRECTION_CODES[game.direction]
+        shift = (self.chunk_moves & 3) * 2
+        if shift == 0:
+            self.moves.append(code)
+        else:
+            self.moves[-1] |= code << shift
+        self.chunk_moves += 1
+        self.steps += 1
+        if ate:
+            self.fruits.extend((self.steps, game.fruit[0], game.fruit[1]))
+        if self.chunk_moves == self.CHUNK_MOVES:
+            self.flush()
+
+    def flush(self):
+        if self.chunk_moves == 0 and not self.fruits:
+            return
+        self.file.write(_CHUNK.pack(self.chunk_moves, len(self.fruits) // 3))
+        self.file.write(self.moves)
+        self.file.write(self.fruits.tobytes())
+        self.moves = bytearray()
+        self.fruits = array("I")
+        self.chunk_moves = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@dataclass
+class Replay:
+    seed: Optional[int]
+    solver: str
+    term_width: int
+    term_height: int
+    direction: str
+    snake: Tuple[Tuple[int, int], ...]
+    steps: int = 0
+    moves: bytearray = field(default_factory=bytearray, repr=False)
+    fruits: Dict[int, Tuple[int, int]] = field(default_factory=dict, repr=False)
+
+    def directions(self) -> Iterator[str]:
+        moves = self.moves
+        for step in range(self.steps):
+            yield DIRECTION_KEYS[(moves[step >> 2] >> ((step & 3) * 2)) & 3]
+
+
+def _read(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("truncated replay file")
+    return data
+
+
+def read_replay(path: str) -> Replay:
+    with open(path, "rb") as f:
+        magic, version, has_seed, seed, term_width, term_height, direction = _HEADER.unpack(_read(f, _HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay file")
+        (name_length,) = struct.unpack("<B", _read(f, 1))
+        solver = _read(f, name_length).decode()
+        (snake_length,) = struct.unpack("<I", _read(f, 4))
+        coordinates = array("H", _read(f, 4 * snake_length))
+        snake = tuple(zip(coordinates[0::2], coordinates[1::2]))
+        replay = Replay(seed if has_seed else None, solver, term_width, term_height, DIRECTION_KEYS[direction], snake)
+
+        while header := f.read(_CHUNK.size):
+            if len(header) != _CHUNK.size:
+                raise ValueError("truncated replay file")
+            moves, fruits = _CHUNK.unpack(header)
+            if replay.steps & 3:
+                raise ValueError("moves after a partly filled chunk")
+            replay.moves += _read(f, (moves + 3) // 4)
+            replay.steps += moves
+            entries = array("I", _read(f, 12 * fruits))
+            for index in range(0, len(entries), 3):
+                replay.fruits[entries[index]] = (entries[index + 1], entries[index + 2])
+    return replay
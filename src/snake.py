@@ -2,151 +2,545 @@
 # requires-python = ">=3.10"
 # dependencies = [
 #     "blessed==1.20.0",
+#     "numpy",
 # ]
 # ///
 import argparse
+import os
 import random
 import sys
 import time
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Generator, Iterator, NamedTuple, Optional, Tuple
 
-import blessed
+import instrument
+from board import DIRECTION_CODE, Board, opposite
+from replay import Recorder, Replay, read_replay
+from solver import SOLVERS, MoveBudget, format_budget_stats, get_next_direction, take_branch, use_move_budget, use_transposition_table, warm_up
+from state import GameState, game_board
+from transposition import EVICTIONS, TranspositionTable, format_stats
 
-from solver import get_next_direction
-from state import GameState
+# headless runs never load the terminal stack, the process pool or the event sinks
+if TYPE_CHECKING:
+    import multiprocessing
 
+    import blessed
 
-def update_game_state(game: GameState) -> Optional[GameState]:
-    direction = get_next_direction(game)
-    if direction is None:
-        return None
+    from metrics import EventSink
 
-    illegal_turns = {"KEY_LEFT": "KEY_RIGHT", "KEY_RIGHT": "KEY_LEFT", "KEY_UP": "KEY_DOWN", "KEY_DOWN": "KEY_UP"}
-    if illegal_turns.get(game.direction) == direction:
-        direction = game.direction
-
-    head_x, head_y = game.snake[0]
-    if direction == "KEY_LEFT":
-        head_x -= 1
-    elif direction == "KEY_RIGHT":
-        head_x += 1
-    elif direction == "KEY_UP":
-        head_y -= 1
-    elif direction == "KEY_DOWN":
-        head_y += 1
-    new_head = (head_x, head_y)
-
-    if new_head in game.snake or not (1 <= new_head[0] < game.term_width - 1 and 1 <= new_head[1] < game.term_height - 1):
+
+def update_game_state(game: GameState, solver: Callable[[GameState], Optional[str]] = get_next_direction, rng: random.Random = random) -> Optional[GameState]:
+    direction = solver(game)
+    if direction is None:
         return None
+    return advance_game_state(game, direction, rng=rng)
 
-    new_snake = list(game.snake)
-    new_snake.insert(0, new_head)
 
-    if new_head == game.fruit:
+def advance_game_state(game: GameState, direction: str, fruit: Optional[Tuple[int, int]] = None, rng: random.Random = random) -> Optional[GameState]:
+    # fruit replaces the draw from rng when the move eats, e.g. while playing back a replay.
+    # a reversal is ignored and the snake keeps going, an unknown key ends the game like a wall.
+    code = DIRECTION_CODE.get(direction)
+    if code is None:
+        return None
+    current = DIRECTION_CODE.get(game.direction)
+    if current is not None and code == opposite(current):
+        code, direction = current, game.direction
+
+    board = game_board(game)
+    head = board.cell(game.snake[0])
+    cell = board.step(head, code)
+    if cell == head or board.occupied[cell]:
+        return None
+    if board.position(cell) == game.fruit:
+        board.advance(cell, grow=True)
         new_score = game.score + 1
-        all_cells = set((x, y) for x in range(1, game.term_width - 1) for y in range(1, game.term_height - 1))
-        valid_fruit_cells = all_cells - set(new_snake)
-        if not valid_fruit_cells:
-            return GameState(tuple(new_snake), new_head, direction, new_score, game.term_width, game.term_height)
-        new_fruit = random.choice(list(valid_fruit_cells))
+        new_fruit = board.random_free_cell(rng) if fruit is None else fruit
+        if new_fruit is None:
+            return GameState(board.view(), board.position(cell), direction, new_score, game.term_width, game.term_height, board)
 
-        return GameState(tuple(new_snake), new_fruit, direction, new_score, game.term_width, game.term_height)
+        return GameState(board.view(), new_fruit, direction, new_score, game.term_width, game.term_height, board)
     else:
-        new_snake.pop()
-        return GameState(tuple(new_snake), game.fruit, direction, game.score, game.term_width, game.term_height)
+        board.advance(cell, grow=False)
+        return GameState(board.view(), game.fruit, direction, game.score, game.term_width, game.term_height, board)
 
 
-def render(term: blessed.Terminal, game: GameState):
-    print(term.home + term.clear, end="")
-
-    print(term.move_xy(0, 0) + "┌" + "─" * (game.term_width - 2) + "┐")
+def _frame(term: "blessed.Terminal", game: GameState) -> str:
+    parts = [term.home + term.clear]
+    parts.append(term.move_xy(0, 0) + "┌" + "─" * (game.term_width - 2) + "┐")
     for y in range(1, game.term_height - 1):
-        print(term.move_xy(0, y) + "│", end="")
-        print(term.move_xy(game.term_width - 1, y) + "│")
-    print(term.move_xy(0, game.term_height - 1) + "└" + "─" * (game.term_width - 2) + "┘", end="")
-
-    score_text = f"Score: {game.score}"
-    print(term.move_xy(1, 0) + score_text, end="")
-
+        parts.append(term.move_xy(0, y) + "│" + term.move_xy(game.term_width - 1, y) + "│")
+    parts.append(term.move_xy(0, game.term_height - 1) + "└" + "─" * (game.term_width - 2) + "┘")
+    parts.append(term.move_xy(1, 0) + f"Score: {game.score}")
     for x, y in game.snake:
-        print(term.move_xy(x, y) + "█", end="")
-
-    print(term.move_xy(game.fruit[0], game.fruit[1]) + "ó", end="")
-    sys.stdout.flush()
-
-
-def game_loop(term: blessed.Terminal, initial_game_state: GameState):
-    game = initial_game_state
-    last_game_state = initial_game_state
+        parts.append(term.move_xy(x, y) + "█")
+    parts.append(term.move_xy(game.fruit[0], game.fruit[1]) + "ó")
+    return "".join(parts)
+
+
+class Renderer:
+    # keeps the last drawn state and after the first frame only writes what changed since then:
+    # the new head, the vacated tail, the fruit and the score, in one buffered write per frame.
+
+    def __init__(self, term: "blessed.Terminal"):
+        self.term = term
+        self.previous: Optional[GameState] = None
+
+    def _diff(self, previous: GameState, game: GameState) -> Optional[str]:
+        # None when the states are not one move apart, e.g. after a resize or a skipped frame
+        grown = len(game.snake) - len(previous.snake)
+        if len(game.snake) < 2 or game.snake[1] != previous.snake[0] or grown not in (0, 1):
+            return None
+        term = self.term
+        parts = []
+        if grown == 0 and previous.snake[-1] != game.snake[0]:
+            x, y = previous.snake[-1]
+            parts.append(term.move_xy(x, y) + " ")
+        x, y = game.snake[0]
+        parts.append(term.move_xy(x, y) + "█")
+        if game.fruit != previous.fruit or game.fruit == game.snake[0]:
+            parts.append(term.move_xy(game.fruit[0], game.fruit[1]) + "ó")
+        if game.score != previous.score:
+            parts.append(term.move_xy(1, 0) + f"Score: {game.score}")
+        return "".join(parts)
+
+    def draw(self, game: GameState):
+        previous = self.previous
+        frame = None
+        if previous is not None and (previous.term_width, previous.term_height) == (game.term_width, game.term_height):
+            frame = self._diff(previous, game)
+        if frame is None:
+            frame = _frame(self.term, game)
+        sys.stdout.write(frame)
+        sys.stdout.flush()
+        self.previous = game
+
+
+def show_game_states(term: "blessed.Terminal", states: Iterator[GameState], fps: float = 100) -> Optional[GameState]:
+    # draws the states one frame each and returns the last one. fps <= 0 draws as fast as they come.
+    game = next(states, None)
+    last_game_state = game
+    renderer = Renderer(term)
+    frame_time = 1 / fps if fps > 0 else 0
+    next_frame = time.perf_counter()
     with term.cbreak(), term.hidden_cursor():
-        while game:
-            render(term, game)
+        while game is not None:
+            renderer.draw(game)
             last_game_state = game
-            game = update_game_state(game)
-            time.sleep(0.01)
+            game = next(states, None)
+            next_frame += frame_time
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.perf_counter()
     return last_game_state
 
 
-def cli_game_loop(initial_game_state: GameState) -> Tuple[GameState, int]:
+def game_loop(term: "blessed.Terminal", initial_game_state: GameState, solver: Callable[[GameState], Optional[str]] = get_next_direction, fps: float = 100) -> GameState:
+    def states() -> Iterator[GameState]:
+        game = initial_game_state
+        while game:
+            yield game
+            game = update_game_state(game, solver)
+
+    return show_game_states(term, states(), fps)
+
+
+def replay_game_states(replay: Replay) -> Iterator[GameState]:
+    # the recorded game from its opening state on. fails loudly if the moves or fruits do not fit the rules.
+    board = Board.from_snake(replay.snake, replay.term_width - 2, replay.term_height - 2)
+    game = GameState(replay.snake, replay.fruits[0], replay.direction, 0, replay.term_width, replay.term_height, board)
+    yield game
+    for step, direction in enumerate(replay.directions(), 1):
+        fruit = replay.fruits.get(step)
+        score = game.score
+        game = advance_game_state(game, direction, fruit)
+        if game is None:
+            raise ValueError(f"illegal move {direction} at step {step}")
+        if (game.score > score) != (fruit is not None):
+            raise ValueError(f"recorded fruits do not match the meals at step {step}")
+        if fruit is not None and board.is_occupied(fruit) and board.free_count > 0:
+            raise ValueError(f"fruit {fruit} at step {step} lies on the snake")
+        yield game
+
+
+def verify_replay(replay: Replay, solver: Callable[[GameState], Optional[str]]) -> Tuple[GameState, int]:
+    # plays the replay back and returns the final state and how many recorded moves the solver picks again
+    agreed = 0
+    states = replay_game_states(replay)
+    game = next(states)
+    for direction in replay.directions():
+        agreed += solver(game) == direction
+        game = next(states)
+    return game, agreed
+
+
+def cli_game_loop(initial_game_state: GameState, solver: Callable[[GameState], Optional[str]] = get_next_direction, max_steps: Optional[int] = None, recorder: Optional[Recorder] = None, rng: random.Random = random) -> Tuple[GameState, int]:
+    # plays the game to its end and returns the last state and the number of moves tried, the one
+    # that ended the game included. this is stream_game without events, which then yields nothing.
+    try:
+        next(stream_game(initial_game_state, solver, max_steps, recorder, rng, events=False))
+    except StopIteration as finished:
+        return finished.value
+    raise AssertionError("stream_game yielded an event with events=False")
+
+
+class StepEvent(NamedTuple):
+    step: int
+    score: int
+    length: int
+    decision_time: float  # seconds spent in the solver
+    branch: Optional[str]  # the solver rule that picked the move, see solver.take_branch
+    steps_since_last_fruit: int  # the game counts as live-locked past twice the board size
+
+
+def stream_game(initial_game_state: GameState, solver: Callable[[GameState], Optional[str]] = get_next_direction, max_steps: Optional[int] = None, recorder: Optional[Recorder] = None, rng: random.Random = random, events: bool = True) -> Generator[StepEvent, None, Tuple[GameState, int]]:
+    # the game loop of the cli, with an event per step, the last one for the move that ended the game.
+    # returns the last state and the step count, get them with `yield from` or EventSink.write_game.
+    # with events=False no step is timed and nothing is yielded, which is how cli_game_loop plays.
     game = initial_game_state
     steps = 0
-    last_game_state = initial_game_state
     steps_since_last_fruit = 0
-
-    while game:
-        last_game_state = game
-        prev_score = game.score
-        game = update_game_state(game)
+    live_lock_steps = (initial_game_state.term_width - 2) * (initial_game_state.term_height - 2) * 2
+    take_branch()
+
+    while True:
+        if events:
+            start = time.perf_counter()
+            direction = solver(game)
+            decision_time = time.perf_counter() - start
+            branch = take_branch()
+        else:
+            direction = solver(game)
+        next_game = None if direction is None else advance_game_state(game, direction, rng=rng)
         steps += 1
 
-        if not game:
-            break
-
-        if game.score > prev_score:
-            steps_since_last_fruit = 0
-        else:
-            steps_since_last_fruit += 1
+        if not next_game:
+            if events:
+                yield StepEvent(steps, game.score, len(game.snake), decision_time, branch, steps_since_last_fruit)
+            return game, steps
+        if recorder is not None:
+            recorder.record(next_game, next_game.score > game.score)
+        steps_since_last_fruit = 0 if next_game.score > game.score else steps_since_last_fruit + 1
+        game = next_game
+        if events:
+            yield StepEvent(steps, game.score, len(game.snake), decision_time, branch, steps_since_last_fruit)
 
-        live_lock = steps_since_last_fruit > (initial_game_state.term_width - 2) * (initial_game_state.term_height - 2) * 2
-        if live_lock:
-            break
-    return last_game_state, steps
+        if steps_since_last_fruit > live_lock_steps or steps == max_steps:
+            return game, steps
 
 
-def init_game_state(term_width: int, term_height: int) -> GameState:
+def init_game_state(term_width: int, term_height: int, rng: random.Random = random) -> GameState:
     snake = tuple((term_width // 2 - i, term_height // 2) for i in range(3))
-    all_cells = set((x, y) for x in range(1, term_width - 1) for y in range(1, term_height - 1))
-    valid_fruit_cells = all_cells - set(snake)
-    fruit = random.choice(list(valid_fruit_cells))
-    return GameState(snake=snake, fruit=fruit, direction="KEY_RIGHT", score=0, term_width=term_width, term_height=term_height)
+    board = Board.from_snake(snake, term_width - 2, term_height - 2)
+    fruit = board.random_free_cell(rng)
+    return GameState(snake=snake, fruit=fruit, direction="KEY_RIGHT", score=0, term_width=term_width, term_height=term_height, board=board)
+
+
+def game_seed(seed: int, run: int) -> int:
+    # splits the root seed into one seed per run with a round of splitmix64, so neighbouring runs
+    # and neighbouring root seeds get unrelated fruit streams. kept to 63 bits for the replay header.
+    z = (seed * 0x9E3779B97F4A7C15 + run + 1) & 0xFFFFFFFFFFFFFFFF
+    z = (z ^ z >> 30) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+    z = (z ^ z >> 27) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+    return (z ^ z >> 31) >> 1
+
+
+def _play_run(run: int, seed: Optional[int], term_width: int, term_height: int, solver: str, record: Optional[str], max_steps: Optional[int], events: Optional["EventSink"] = None) -> Tuple[int, int]:
+    # every run draws its fruits from its own rng, seeded from (seed, run) when there is a root seed
+    seed = None if seed is None else game_seed(seed, run)
+    rng = random.Random(seed)
+    initial_game_state = init_game_state(term_width, term_height, rng)
+    recorder = None if record is None else Recorder(os.path.join(record, f"run{run:05d}.replay"), initial_game_state, seed, solver)
+    try:
+        if events is None:
+            final_game_state, steps = cli_game_loop(initial_game_state, SOLVERS[solver], max_steps, recorder, rng)
+        else:
+            final_game_state, steps = events.write_game(run, stream_game(initial_game_state, SOLVERS[solver], max_steps, recorder, rng))
+    finally:
+        if recorder is not None:
+            recorder.close()
+    return final_game_state.score, steps
+
+
+def _install_table(table: Optional[Tuple[int, str]]) -> Optional[TranspositionTable]:
+    # table is (capacity, eviction) or None to decide every move from scratch
+    installed = None if table is None else TranspositionTable(*table)
+    use_transposition_table(installed)
+    return installed
+
+
+def _install_budget(budget: Optional[float]) -> Optional[MoveBudget]:
+    # budget is the anytime solver's seconds per move, or None to keep the one installed
+    installed = None if budget is None else MoveBudget(budget)
+    if installed is not None:
+        use_move_budget(installed)
+    return installed
+
+
+def _benchmark_worker(worker_id: int, runs: int, workers: int, seed: Optional[int], term_width: int, term_height: int, solver: str, record: Optional[str], table: Optional[Tuple[int, str]], max_steps: Optional[int], budget: Optional[float], results: "multiprocessing.Queue"):
+    # posts (worker_id, score, steps) per run, then (worker_id, None, (elapsed, table stats, budget stats)),
+    # or (worker_id, None, error) once a run raises, for run_benchmark to raise again.
+    try:
+        installed = _install_table(table)
+        budgeted = _install_budget(budget)
+        start = time.perf_counter()
+        for run in range(worker_id, runs, workers):
+            score, steps = _play_run(run, seed, term_width, term_height, solver, record, max_steps)
+            results.put((worker_id, score, steps))
+    except Exception as error:
+        results.put((worker_id, None, error))
+        return
+    results.put((worker_id, None, (time.perf_counter() - start, installed and installed.stats(), budgeted and budgeted.stats())))
+
+
+def run_benchmark(runs: int, workers: int, seed: Optional[int], term_width: int, term_height: int, worker_times: Dict[int, float], solver: str = "astar", record: Optional[str] = None, table: Optional[Tuple[int, str]] = None, table_stats: Optional[Dict[int, Dict[str, int]]] = None, max_steps: Optional[int] = None, events: Optional["EventSink"] = None, budget: Optional[float] = None, budget_stats: Optional[Dict[int, Dict[str, float]]] = None) -> Iterator[Tuple[int, int]]:
+    # yields (score, steps) per run as soon as it finishes. worker i plays runs i, i + workers, ...
+    # a root seed fixes the fruits of every run, whichever worker plays it, see game_seed.
+    # with record set, run i is written to record/run<i>.replay along with the seed of its rng.
+    # with table set, every worker caches decisions in its own transposition table and reports its stats in table_stats.
+    # events streams every step into the sink, which only works in-process.
+    # with budget set, every worker gives the anytime solver that many seconds per move and reports in budget_stats.
+    if workers <= 1:
+        installed = _install_table(table)
+        budgeted = _install_budget(budget)
+        start = time.perf_counter()
+        for run in range(runs):
+            yield _play_run(run, seed, term_width, term_height, solver, record, max_steps, events)
+        worker_times[0] = time.perf_counter() - start
+        if installed is not None and table_stats is not None:
+            table_stats[0] = installed.stats()
+        if budgeted is not None and budget_stats is not None:
+            budget_stats[0] = budgeted.stats()
+        return
+
+    import multiprocessing
+    import queue
+
+    workers = min(workers, runs)
+    results = multiprocessing.Queue()
+    processes = []
+    for worker_id in range(workers):
+        process = multiprocessing.Process(target=_benchmark_worker, args=(worker_id, runs, workers, seed, term_width, term_height, solver, record, table, max_steps, budget, results), daemon=True)
+        process.start()
+        processes.append(process)
+
+    try:
+        while len(worker_times) < workers:
+            try:
+                worker_id, score, value = results.get(timeout=1)
+            except queue.Empty:
+                # a worker that died without a word, e.g. killed or failing to pickle its error
+                for worker_id, process in enumerate(processes):
+                    if worker_id not in worker_times and process.exitcode is not None and results.empty():
+                        raise RuntimeError(f"worker {worker_id} exited with code {process.exitcode} before finishing its runs") from None
+                continue
+            if score is None and isinstance(value, BaseException):
+                raise RuntimeError(f"benchmark worker {worker_id} failed") from value
+            if score is None:
+                worker_times[worker_id], stats, budgeted = value
+                if stats is not None and table_stats is not None:
+                    table_stats[worker_id] = stats
+                if budgeted is not None and budget_stats is not None:
+                    budget_stats[worker_id] = budgeted
+            else:
+                yield score, value
+    finally:
+        # an aborted benchmark (e.g. a failed run) should not leave workers playing in the background.
+        for process in processes:
+            if len(worker_times) < workers:
+                process.terminate()
+            process.join()
+
+
+def _peak_memory_mb() -> float:
+    # largest resident set of this process and its finished workers. ru_maxrss is in kilobytes on linux.
+    import resource
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / 1024
+
+
+def _prepare(solver: str, term_width: int, term_height: int, warmup: bool, timings: bool):
+    # startup is the cpu time spent before this point, mostly the interpreter and the imports. the
+    # first move is timed on a throwaway game, after the warm-up if there is one.
+    startup = time.process_time()
+    start = time.perf_counter()
+    if warmup:
+        warm_up(term_width - 2, term_height - 2)
+    warm = time.perf_counter()
+    SOLVERS[solver](init_game_state(term_width, term_height, random.Random(0)))
+    first_move = time.perf_counter() - warm
+    take_branch()
+    if timings:
+        print(f"startup: {startup * 1e3:.1f}ms")
+        if warmup:
+            print(f"warm-up: {(warm - start) * 1e3:.1f}ms")
+        print(f"first move: {first_move * 1e3:.2f}ms")
 
 
 def main():
     parser = argparse.ArgumentParser(description="run the snake game.")
     parser.add_argument("--cli", action="store_true", help="run in cli mode without graphics.")
     parser.add_argument("--runs", type=int, default=1, help="number of times to run the game.")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), default="astar", help="policy that picks the moves.")
+    parser.add_argument("--compare", nargs="+", choices=sorted(SOLVERS), default=[], metavar="SOLVER", help="also play the cli runs with these solvers and report their average steps next to --solver's.")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes to spread the runs across.")
+    parser.add_argument("--batch", type=int, default=0, help="step this many games in lockstep with numpy, using the cycle solver's policy.")
+    parser.add_argument("--seed", type=int, default=None, help="root seed of the cli runs, run i draws its fruits from an rng seeded by game_seed(seed, i).")
+    parser.add_argument("--size", type=int, nargs=2, default=[10, 10], metavar=("WIDTH", "HEIGHT"), help="terminal size of cli games, the board is the area inside the border.")
+    parser.add_argument("--max-steps", type=int, default=None, help="cut cli games off after this many steps instead of checking that they win.")
+    parser.add_argument("--fps", type=float, default=100, help="frame rate of the graphical mode, 0 for as fast as possible.")
+    parser.add_argument("--profile", action="store_true", help="time the solver's hot paths and print a summary after the runs.")
+    parser.add_argument("--profile-stacks", default=None, help="also write folded call stacks for flamegraph tools to this file.")
+    parser.add_argument("--move-budget", type=float, default=0.01, help="seconds the anytime solver may think per move before it follows the cycle.")
+    parser.add_argument("--table-size", type=int, default=0, help="cache up to this many astar decisions per process, keyed by a zobrist hash of the board.")
+    parser.add_argument("--table-eviction", choices=EVICTIONS, default="lru", help="which decision the full cache drops first.")
+    parser.add_argument("--events", default=None, help="stream per-step events of the cli runs to this file, .jsonl or .csv.")
+    parser.add_argument("--warmup", action="store_true", help="build the solver's tables for the cli board before the runs are timed.")
+    parser.add_argument("--timings", action="store_true", help="report startup, warm-up and first-move latency of cli runs separately.")
+    parser.add_argument("--record", default=None, help="directory to write a replay file per cli run to.")
+    parser.add_argument("--replay", default=None, help="play back a replay file, with --cli check it against its solver instead.")
+    subparsers = parser.add_subparsers(dest="command")
+    benchmark_parser = subparsers.add_parser("benchmark", help="sweep board sizes, solvers and seeds and compare against a baseline.")
+    benchmark_parser.add_argument("--sizes", type=int, nargs="+", default=[10, 20, 50, 100], help="square terminal sizes to play on.")
+    benchmark_parser.add_argument("--solvers", nargs="+", choices=sorted(SOLVERS), default=sorted(SOLVERS), help="solvers to measure.")
+    benchmark_parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2], help="rng seeds, one game per seed.")
+    benchmark_parser.add_argument("--max-steps", type=int, default=2000, help="cut games off after this many steps, 0 plays them out.")
+    benchmark_parser.add_argument("--output", default="bench_output.json", help="where to write the results, .json or .csv.")
+    benchmark_parser.add_argument("--baseline", default=None, help="earlier results (.json or .csv) to compare against.")
+    benchmark_parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that counts as a regression.")
+    tournament_parser = subparsers.add_parser("tournament", help="play seeded games with several solvers at once and rank them.")
+    tournament_parser.add_argument("--solvers", nargs="+", default=sorted(SOLVERS), help="registered solver names or module:function.")
+    tournament_parser.add_argument("--games", type=int, default=20, help="games per solver, seeded seed, seed + 1, ...")
+    tournament_parser.add_argument("--seed", type=int, default=0, help="seed of the first game.")
+    tournament_parser.add_argument("--size", type=int, default=10, help="square terminal size to play on.")
+    tournament_parser.add_argument("--budget", type=float, default=0.5, help="seconds a solver may think per move before it is disqualified.")
+    tournament_parser.add_argument("--concurrency", type=int, default=8, help="games in flight per solver.")
     args = parser.parse_args()
 
+    if args.command == "benchmark":
+        from benchmark import run_suite
+
+        exit(run_suite(args.sizes, args.solvers, args.seeds, args.max_steps or None, args.output, args.baseline, args.threshold))
+
+    if args.command == "tournament":
+        import asyncio
+
+        from tournament import format_ranking, run_tournament
+
+        seeds = range(args.seed, args.seed + args.games)
+        print(format_ranking(asyncio.run(run_tournament(args.solvers, seeds, args.size, args.budget, args.concurrency))))
+        exit(0)
+
+    profile = args.profile or args.profile_stacks is not None
+    if profile and (args.workers > 1 or args.batch > 0):
+        parser.error("--profile measures in-process runs only, drop --workers and --batch.")
+    if args.events is not None and (args.workers > 1 or args.batch > 0):
+        parser.error("--events streams in-process runs only, drop --workers and --batch.")
+    if args.record is not None and args.batch > 0:
+        parser.error("--record does not cover --batch runs.")
+    if args.compare and args.batch > 0:
+        parser.error("--compare does not cover --batch runs.")
+    if args.max_steps is not None and args.batch > 0:
+        parser.error("--batch games always play to the end, drop --max-steps.")
+    if args.move_budget <= 0:
+        parser.error("--move-budget must be positive.")
+
+    if args.replay is not None:
+        replay = read_replay(args.replay)
+        if args.cli:
+            final_game_state, agreed = verify_replay(replay, SOLVERS[replay.solver])
+            print(f"replayed {replay.steps} moves of {replay.solver} (seed {replay.seed}), final score {final_game_state.score}")
+            print(f"solver agrees on {agreed}/{replay.steps} moves")
+            exit(0)
+        import blessed
+
+        term = blessed.Terminal()
+        final_game_state = show_game_states(term, replay_game_states(replay), args.fps)
+        print(term.home + term.clear)
+        print(term.move_xy(0, 0) + f"replayed {replay.steps} moves, final score {final_game_state.score}")
+        exit(0)
+
     # silent mode for benchmarking
     if args.cli:
         total_score = 0
         total_steps = 0
-        term_width = 10
-        term_height = 10
+        term_width, term_height = args.size
         max_score = float((term_width - 2) * (term_height - 2) - 3)
-        for _ in range(args.runs):
-            initial_game_state = init_game_state(term_width, term_height)
-            final_game_state, steps = cli_game_loop(initial_game_state)
-            total_score += final_game_state.score
+
+        if args.batch > 0:
+            from batch import play_batches
+
+            start = time.perf_counter()
+            for games in play_batches(args.runs, args.batch, term_width - 2, term_height - 2, args.seed):
+                assert games.won.all(), f"incorrect solution: only got {games.score.min()}/{max_score}"
+                total_steps += int(games.steps.sum())
+            elapsed = time.perf_counter() - start
+            print(f"average steps: {total_steps / args.runs}")
+            print(f"games per second: {args.runs / elapsed:.1f}")
+            print(f"peak memory: {_peak_memory_mb():.1f}MB")
+            exit(0)
+
+        if args.warmup or args.timings:
+            _prepare(args.solver, term_width, term_height, args.warmup, args.timings)
+
+        # the same seeded runs with every compared solver, played before the profiler and sinks are on
+        compared: Dict[str, float] = {}
+        for name in dict.fromkeys(args.compare):
+            outcomes = list(run_benchmark(args.runs, args.workers, args.seed, term_width, term_height, {}, name, max_steps=args.max_steps, budget=args.move_budget))
+            if args.max_steps is None:
+                assert all(score == max_score for score, _ in outcomes), f"incorrect solution by {name}: only got {min(score for score, _ in outcomes)}/{max_score}"
+            compared[name] = sum(steps for _, steps in outcomes) / args.runs
+
+        worker_times: Dict[int, float] = {}
+        table = (args.table_size, args.table_eviction) if args.table_size > 0 else None
+        table_stats: Dict[int, Dict[str, int]] = {}
+        budget_stats: Dict[int, Dict[str, float]] = {}
+        if args.record is not None:
+            os.makedirs(args.record, exist_ok=True)
+        if profile:
+            instrument.enable()
+        events = None
+        if args.events is not None:
+            from metrics import EventSink
+
+            events = EventSink(args.events)
+        for score, steps in run_benchmark(args.runs, args.workers, args.seed, term_width, term_height, worker_times, args.solver, args.record, table, table_stats, args.max_steps, events, args.move_budget, budget_stats):
+            total_score += score
             total_steps += steps
-            assert final_game_state.score == max_score, f"incorrect solution: only got {final_game_state.score}/{max_score}"
+            if args.max_steps is None:
+                assert score == max_score, f"incorrect solution: only got {score}/{max_score}"
+        if events is not None:
+            events.close()
+            print(f"{events.written} step events written to {args.events}")
         print(f"average steps: {total_steps / args.runs}")
+        for name, average in compared.items():
+            print(f"average steps ({name}): {average}")
+        if args.max_steps is not None:
+            print(f"average score: {total_score / args.runs} of {max_score:.0f}")
+        if len(worker_times) > 1:
+            for worker_id, elapsed in sorted(worker_times.items()):
+                print(f"worker {worker_id}: {len(range(worker_id, args.runs, len(worker_times)))} runs in {elapsed:.3f}s")
+        if table_stats:
+            print(format_stats(list(table_stats.values())))
+        if budget_stats and args.solver == "anytime":
+            print(format_budget_stats(args.move_budget, list(budget_stats.values())))
+        print(f"peak memory: {_peak_memory_mb():.1f}MB")
+        if profile:
+            print(instrument.summary())
+        if args.profile_stacks:
+            instrument.write_stacks(args.profile_stacks)
         exit(0)
 
     # graphical mode for debugging
+    if args.table_size > 0:
+        _install_table((args.table_size, args.table_eviction))
+    _install_budget(args.move_budget)
+    import blessed
+
     term = blessed.Terminal()
     initial_game_state = init_game_state(term.width, term.height)
-    final_game_state = game_loop(term, initial_game_state)
+    final_game_state = game_loop(term, initial_game_state, SOLVERS[args.solver], args.fps)
     print(term.home + term.clear)
     score = final_game_state.score
     max_size = (final_game_state.term_width - 2) * (final_game_state.term_height - 2)
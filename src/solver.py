@@ -1,108 +1,83 @@
+import importlib
+import time
 from functools import lru_cache
-from typing import Dict, Optional, Sequence, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
 
-from state import GameState
-from utils import a_star_search, count_reachable_cells
-
-
-DIRECTION_VECTORS: Dict[str, Tuple[int, int]] = {
-    "KEY_UP": (0, -1),
-    "KEY_DOWN": (0, 1),
-    "KEY_LEFT": (-1, 0),
-    "KEY_RIGHT": (1, 0),
-}
-
-
-def _vector_to_direction(vector: Tuple[int, int]) -> Optional[str]:
-    for direction, offset in DIRECTION_VECTORS.items():
-        if offset == vector:
-            return direction
-    return None
-
-
-def _within_bounds(game: GameState, position: Tuple[int, int]) -> bool:
-    width = game.term_width - 2
-    height = game.term_height - 2
-    return 1 <= position[0] <= width and 1 <= position[1] <= height
+import instrument
+from board import DIRECTION_CODE, DIRECTIONS, Board, zobrist_keys
+from cycle import DynamicCycle, cycle_index, cycle_successors
+from state import GameState, game_board
+from transposition import TranspositionTable
+from utils import CHECK_EVERY, DeadlineExceeded, DistanceField, a_star_engine, a_star_search, check_deadline, set_deadline
 
 
 def _is_move_valid(game: GameState, direction: str) -> bool:
-    dx, dy = DIRECTION_VECTORS[direction]
-    head_x, head_y = game.snake[0]
-    next_head = (head_x + dx, head_y + dy)
-
-    if not _within_bounds(game, next_head):
-        return False
-
-    if next_head in game.snake:
-        return False
-
-    return True
+    board = game_board(game)
+    head = board.cell(game.snake[0])
+    cell = board.step(head, DIRECTION_CODE[direction])
+    return cell != head and not board.occupied[cell]
 
 
-def _apply_move(game: GameState, direction: str) -> Optional[GameState]:
-    if not _is_move_valid(game, direction):
-        return None
-
-    dx, dy = DIRECTION_VECTORS[direction]
-    head_x, head_y = game.snake[0]
-    next_head = (head_x + dx, head_y + dy)
-    snake = list(game.snake)
-
-    if next_head == game.fruit:
-        snake.insert(0, next_head)
-        score = game.score + 1
-    else:
-        snake.insert(0, next_head)
-        snake.pop()
-        score = game.score
-
-    return GameState(
-        snake=tuple(snake),
-        fruit=game.fruit,
-        direction=direction,
-        score=score,
-        term_width=game.term_width,
-        term_height=game.term_height,
-    )
-
-
-def _direction_from_path(path: Tuple[Tuple[int, int], ...]) -> Optional[str]:
+def _direction_from_path(board: Board, path: Sequence[Tuple[int, int]]) -> Optional[str]:
     if len(path) < 2:
         return None
-    dx = path[1][0] - path[0][0]
-    dy = path[1][1] - path[0][1]
-    return _vector_to_direction((dx, dy))
-
-
-def _has_escape_route(game: GameState) -> bool:
-    # return True if the snake can keep moving safely from the given state
-
-    # ensure that the snake will still be able to reach its tail after the move.
-    path_to_tail = a_star_search(game, game.snake[0], game.snake[-1])
-    if path_to_tail is not None:
-        return True
-
-    # fall back to checking the size of the accessible region to avoid dead ends.
-    reachable = count_reachable_cells(game, game.snake[0])
-    return reachable > 0
+    code = board.direction(board.cell(path[0]), board.cell(path[1]))
+    return None if code is None else DIRECTIONS[code]
 
 
+@instrument.probe
 def _simulate_path(game: GameState, path: Sequence[Tuple[int, int]]) -> Optional[GameState]:
-    state = game
-    for index in range(1, len(path)):
-        prev = path[index - 1]
-        curr = path[index]
-        direction = _vector_to_direction((curr[0] - prev[0], curr[1] - prev[1]))
-        if direction is None:
+    # plays the path on a virtual snake. move i may not enter a cell the body still covers, i.e.
+    # one entered after the current tail, and the final body is the reversed path in front of what
+    # is left of the old body. only that final state is built and checked, on the live board under
+    # a checkpoint that is rolled back afterwards, so a check costs O(path + length), not O(board).
+    # the final body has to follow the cycle, which also leaves it a way out: the cells ahead of the
+    # head along the cycle are free up to the tail, so no search for the tail is needed.
+    # returns the final state with its body as a tuple and no board, or None.
+    board = game_board(game)
+    occupied = board.occupied
+    neighbours = board.neighbours
+    fruit = board.cell(game.fruit) if game.fruit is not None else -1
+    length = len(game.snake)
+    visited: Dict[int, int] = {}  # path cells by the move that entered them, counting the tail's as 0
+    cells = [board.cell(path[0])]
+    grown = 0
+    for i in range(1, len(path)):
+        if i % CHECK_EVERY == 0:
+            check_deadline()
+        previous = cells[-1]
+        if not board.contains(path[i]):
             return None
-        state = _apply_move(state, direction)
-        if state is None:
+        cell = board.cell(path[i])
+        if cell == previous or cell not in neighbours[previous * 4 : previous * 4 + 4]:
             return None
-
-    if state and _has_escape_route(state) and _follows_cycle(state):
-        return state
-    return None
+        entered = visited.get(cell)
+        if entered is None:
+            entered = length - 1 - board.offset(cell) if occupied[cell] else -1
+        if entered >= i - 1 - grown:
+            return None
+        visited[cell] = length - 1 + i
+        cells.append(cell)
+        if cell == fruit:
+            grown += 1
+
+    if len(cells) == 1:
+        state = game
+        return state if _follows_cycle(state) else None
+
+    check_deadline()
+    checkpoint = board.checkpoint()
+    try:
+        for cell in cells[1:]:
+            board.advance(cell, grow=cell == fruit)
+        direction = DIRECTIONS[board.direction(cells[-2], cells[-1])]
+        state = GameState(board.view(), game.fruit, direction, game.score + grown, game.term_width, game.term_height, board)
+        if not _follows_cycle(state):
+            return None
+        return GameState(tuple(state.snake), game.fruit, direction, state.score, game.term_width, game.term_height)
+    finally:
+        board.rollback(checkpoint)
 
 
 def _is_path_safe(game: GameState, path: Sequence[Tuple[int, int]]) -> bool:
@@ -113,87 +88,445 @@ def _is_path_safe(game: GameState, path: Sequence[Tuple[int, int]]) -> bool:
     return final_state is not None
 
 
+@instrument.probe
 def _follows_cycle(game: GameState) -> bool:
     width = game.term_width - 2
     height = game.term_height - 2
-    for idx in range(len(game.snake) - 1):
-        current = game.snake[idx]
-        nxt = game.snake[idx + 1]
-        if _hamilton_successor_map(width, height).get(nxt) != current:
+    index = cycle_index(width, height)
+    size = width * height
+    # walks the body instead of slicing it, as slicing a view copies the whole body before the first look at the clock
+    body = iter(game.snake)
+    x, y = next(body)
+    position = index[(x - 1) * height + y - 1]
+    for offset, (x, y) in enumerate(body, 1):
+        if offset % CHECK_EVERY == 0:
+            check_deadline()
+        previous = index[(x - 1) * height + y - 1]
+        if (previous + 1) % size != position:
             return False
+        position = previous
     return True
 
 
-OPPOSITE_DIRECTIONS = {
-    "KEY_LEFT": "KEY_RIGHT",
-    "KEY_RIGHT": "KEY_LEFT",
-    "KEY_UP": "KEY_DOWN",
-    "KEY_DOWN": "KEY_UP",
-}
+@lru_cache(maxsize=None)
+def _hamilton_successor_map(width: int, height: int) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    board = Board(width, height)
+    successors = cycle_successors(width, height)
+    return {board.position(cell): board.position(successor) for cell, successor in enumerate(successors)}
 
 
-def _hamilton_rule(x: int, y: int, direction: str, width: int, height: int) -> str:
-    if y == 1:
-        target_direction = "KEY_LEFT" if x > 1 else "KEY_DOWN"
-    elif x == width:
-        target_direction = "KEY_UP" if y > 1 else "KEY_LEFT"
-    elif y == height:
-        target_direction = "KEY_RIGHT" if x % 2 != 0 else "KEY_UP"
-    elif x % 2 != 0:
-        target_direction = "KEY_DOWN"
-    elif y > 2:
-        target_direction = "KEY_UP"
-    else:
-        target_direction = "KEY_RIGHT"
+# the rule behind the last move of a built-in solver, e.g. "astar" or "hamilton"
+_branch: Optional[str] = None
 
-    if OPPOSITE_DIRECTIONS[direction] == target_direction:
-        return "KEY_DOWN" if y + 1 <= height else "KEY_UP"
-    return target_direction
 
+def take_branch() -> Optional[str]:
+    # returns and clears the branch, so solvers that never set one report None
+    global _branch
+    branch, _branch = _branch, None
+    return branch
 
-@lru_cache(maxsize=None)
-def _hamilton_successor_map(width: int, height: int) -> Dict[Tuple[int, int], Tuple[int, int]]:
-    assert width % 2 == 0, "width must be even for this Hamiltonian cycle."
 
-    successors: Dict[Tuple[int, int], Tuple[int, int]] = {}
-    x, y = width, 1
-    direction = "KEY_LEFT"
+@instrument.probe
+def _hamilton_direction(game: GameState) -> Optional[str]:
+    global _branch
+    _branch = "hamilton"
+    board = game_board(game)
+    head = board.cell(game.snake[0])
+    return DIRECTIONS[board.direction(head, cycle_successors(board.width, board.height)[head])]
 
-    start = (x, y)
-    while True:
-        move = _hamilton_rule(x, y, direction, width, height)
-        dx, dy = DIRECTION_VECTORS[move]
-        nx, ny = x + dx, y + dy
-        successors[(x, y)] = (nx, ny)
-        x, y = nx, ny
-        direction = move
-        if (x, y) == start:
-            break
 
-    return successors
+# validated paths to the fruit per live board: (board.moves when planned, fruit, path).
+# a plan is followed while the board has advanced exactly along it, in which case the game is in the
+# very state _simulate_path passed through on the way to the state it accepted, so no re-check is needed.
+_plans: "WeakKeyDictionary[Board, Tuple[int, Tuple[int, int], Tuple[Tuple[int, int], ...]]]" = WeakKeyDictionary()
 
 
-def _hamilton_direction(game: GameState) -> Optional[str]:
-    width = game.term_width - 2
-    height = game.term_height - 2
-    head = game.snake[0]
-    successor_map = _hamilton_successor_map(width, height)
-    next_cell = successor_map.get(head)
-    if next_cell is None:
+def _planned_direction(game: GameState) -> Optional[str]:
+    board = game.board
+    plan = _plans.get(board) if board is not None else None
+    if plan is None:
         return None
 
-    dx = next_cell[0] - head[0]
-    dy = next_cell[1] - head[1]
-    return _vector_to_direction((dx, dy))
+    moves, fruit, path = plan
+    step = board.moves - moves
+    if fruit == game.fruit and 0 < step < len(path) - 1 and path[step] == game.snake[0] and board.describes(game.snake):
+        return _direction_from_path(board, path[step : step + 2])
+    del _plans[board]
+    return None
 
 
-def get_next_direction(game: GameState) -> Optional[str]:
-    head = game.snake[0]
+# decisions of get_next_direction by zobrist hash of body and fruit, off unless a table is installed
+transpositions: Optional[TranspositionTable] = None
 
-    path_to_fruit = a_star_search(game, head, game.fruit)
+
+def use_transposition_table(table: Optional[TranspositionTable]):
+    global transpositions
+    transpositions = table
+
+
+def _search_direction(game: GameState) -> Tuple[Optional[str], Optional[Tuple[Tuple[int, int], ...]]]:
+    # the move and, if it starts a validated path to the fruit, that path
+    path_to_fruit = a_star_search(game, game.snake[0], game.fruit)
+    check_deadline()
     if path_to_fruit and len(path_to_fruit) > 1:
-        direction = _direction_from_path(tuple(path_to_fruit))
+        direction = _direction_from_path(game_board(game), path_to_fruit)
         if direction and _is_move_valid(game, direction) and _is_path_safe(game, path_to_fruit):
-            return direction
+            return direction, tuple(path_to_fruit)
+
+    if instrument.enabled:
+        instrument.count("hamilton_fallbacks")
+    return _hamilton_direction(game), None
 
+
+@instrument.probe
+def get_next_direction(game: GameState) -> Optional[str]:
+    global _branch
+    if instrument.enabled:
+        instrument.count("decisions")
+
+    # a plan is followed whatever the clock says, see get_next_direction_anytime. every later phase
+    # may overrun a move budget, so the clock is read between them.
+    direction = _planned_direction(game)
+    if direction is not None:
+        if instrument.enabled:
+            instrument.count("plan_hits")
+        _branch = "plan"
+        return direction
+
+    check_deadline()
+    table = transpositions
+    entry = None
+    if table is not None:
+        key = game_board(game).zobrist(game.fruit)
+        entry = table.get(key)
+    if entry is None:
+        check_deadline()
+        entry = _search_direction(game)
+        if table is not None:
+            table.put(key, entry)
+
+    direction, path = entry
+    _branch = "hamilton" if path is None else "astar"
+    if path is not None and game.board is not None:
+        _plans[game.board] = (game.board.moves, game.fruit, path)
+    return direction
+
+
+def _cycle_move(game: GameState, board: Board, index: Sequence[int]) -> Tuple[Optional[int], int]:
+    # the code and cycle gap of the move get_next_direction_cycle picks on the cycle given by index
+    size = board.size
+    head = board.cell(game.snake[0])
+    head_index = index[head]
+    tail_gap = (index[board.cell(game.snake[-1])] - head_index) % size
+    fruit_gap = (index[board.cell(game.fruit)] - head_index) % size
+    fruit_ahead = fruit_gap < tail_gap
+    length = len(game.snake)
+
+    best_code = None
+    best_gap = 0
+    for code, neighbor in enumerate(board.neighbours[head * 4 : head * 4 + 4]):
+        gap = (index[neighbor] - head_index) % size  # 0 for a wall, whose entry is the head itself
+        if gap == 0 or gap >= tail_gap or gap <= best_gap:
+            continue
+        if gap > 1 and not (fruit_ahead and fruit_gap - gap >= length):
+            continue
+        best_code = code
+        best_gap = gap
+    return best_code, best_gap
+
+
+@instrument.probe
+def get_next_direction_cycle(game: GameState) -> Optional[str]:
+    # shortcut solver working on cycle positions only. the body always lies along the cycle in order
+    # (true for the opening snake and kept by every move picked here), so every cell strictly between
+    # the head and the tail going forward is free and moving there keeps that order.
+    # a shortcut skips cells that the tail must pass before the fruit is eaten, so it is only taken
+    # while the fruit is at least a body length beyond the landing cell. the body is then back to a
+    # gapless stretch of the cycle whenever it grows, and following the cycle can never get stuck.
+    global _branch
+    board = game_board(game)
+    code, gap = _cycle_move(game, board, cycle_index(board.width, board.height))
+    _branch = "shortcut" if gap > 1 else "cycle"
+    return None if code is None else DIRECTIONS[code]
+
+
+# splices start once the body covers 1 / SPLICE_FROM of the board. before that the shortcuts of
+# get_next_direction_cycle already head for the fruit nearly directly, and on large boards splicing
+# for a short body costs O(board) per splice and breaks up the long straight runs those shortcuts use.
+SPLICE_FROM = 8
+
+# rearranged cycles per live board: the cycle, the move count it was last used at and the fruit
+# cell it was last spliced for, as the splice search is only repeated once the fruit has moved
+_cycles: "WeakKeyDictionary[Board, Tuple[DynamicCycle, int, int]]" = WeakKeyDictionary()
+
+
+def _in_cycle_order(board: Board, index: Sequence[int]) -> bool:
+    # whether the body lies along the cycle given by index in order, gaps allowed, within one lap.
+    # this is what get_next_direction_cycle keeps up and relies on.
+    size = board.size
+    cells = board.cells()
+    position = index[next(cells)]
+    lap = 0
+    for cell in cells:
+        previous = index[cell]
+        lap += (position - previous) % size
+        if lap >= size:
+            return False
+        position = previous
+    return True
+
+
+def _splice_target(board: Board, cycle: DynamicCycle, head: int, first: int, last: int, fruit_gap: int) -> Optional[Tuple[int, int]]:
+    # where the stretch first .. last, once cut off as a cycle of its own, can be joined back in
+    # between the fruit and the tail: (c, d) for DynamicCycle.splice, or None
+    successors = cycle.successors
+    index = cycle.index
+    neighbours = board.neighbours
+    size = board.size
+    head_index = index[head]
+    last_free = size - board.length
+    cell = first
+    while True:
+        after = first if cell == last else successors[cell]
+        for other in neighbours[after * 4 : after * 4 + 4]:
+            if fruit_gap <= (index[other] - head_index) % size <= last_free and successors[other] in neighbours[cell * 4 : cell * 4 + 4]:
+                return other, cell
+        if cell == last:
+            return None
+        cell = after
+
+
+def _best_splice(board: Board, cycle: DynamicCycle, head: int, fruit: int) -> Optional[Tuple[int, int, int, int]]:
+    # the longest stretch between the head and the fruit that can be moved to behind the fruit, as
+    # the arguments of DynamicCycle.splice. positions count forward from the head. with the body a
+    # gapless stretch behind the head, positions 1 to size - length are free, and every edge that
+    # changes must start at one of them or at the head.
+    successors = cycle.successors
+    index = cycle.index
+    neighbours = board.neighbours
+    size = board.size
+    head_index = index[head]
+    fruit_gap = (index[fruit] - head_index) % size
+    best = None
+    best_moved = 0
+    cell = head
+    for position in range(fruit_gap - 1):
+        after = successors[cell]
+        for other in neighbours[after * 4 : after * 4 + 4]:
+            moved = (index[other] - head_index) % size - position
+            if moved <= max(best_moved, 1) or position + moved >= fruit_gap or successors[other] not in neighbours[cell * 4 : cell * 4 + 4]:
+                continue
+            target = _splice_target(board, cycle, head, after, other, fruit_gap)
+            if target is not None:
+                best = (cell, other, *target)
+                best_moved = moved
+        cell = after
+    return best
+
+
+@instrument.probe
+def get_next_direction_dynamic(game: GameState) -> Optional[str]:
+    # get_next_direction_cycle on its own copy of the hamiltonian cycle, rearranged on the way. while
+    # the body is a gapless stretch of the cycle, stretches between the head and the fruit are
+    # spliced to behind the fruit for as long as any can be, once per fruit and only once the body
+    # is long enough, see SPLICE_FROM. a game is only taken over if its body lies along the cycle
+    # this solver last used on it, or along the hamiltonian cycle. splices only reorder the free cells
+    # between the head and the tail, so the body keeps its order along the cycle and the shortcut
+    # rule stays safe: a shortcut leaves gaps behind the head, and no splice is made until the tail
+    # has closed them again.
+    global _branch
+    board = game_board(game)
+    entry = _cycles.get(board)
+    if entry is not None and board.describes(game.snake) and board.moves - entry[1] in (0, 1):
+        cycle, _, searched = entry
+    elif entry is not None and _in_cycle_order(board, entry[0].index):
+        cycle, searched = entry[0], -1
+    elif _in_cycle_order(board, cycle_index(board.width, board.height)):
+        cycle, searched = DynamicCycle(board.width, board.height), -1
+    else:
+        # any other cycle would have to be rebuilt around the body, and following one the body
+        # does not lie along can trap the snake
+        raise ValueError("the snake does not lie along the hamiltonian cycle, the dynamic solver cannot take over this game.")
+
+    size = board.size
+    index = cycle.index
+    head = board.cell(game.snake[0])
+    fruit = board.cell(game.fruit)
+    spliced = False
+    if SPLICE_FROM * len(game.snake) >= size and searched != fruit and (index[board.cell(game.snake[-1])] - index[head]) % size == size - len(game.snake) + 1:
+        while (splice := _best_splice(board, cycle, head, fruit)) is not None:
+            cycle.splice(*splice)
+            spliced = True
+        searched = fruit
+    code, gap = _cycle_move(game, board, index)
+    if game.board is not None:
+        _cycles[board] = (cycle, board.moves, searched)
+    _branch = "shortcut" if gap > 1 else "splice" if spliced else "cycle"
+    return None if code is None else DIRECTIONS[code]
+
+
+# distance fields to the fruit per live board, with the board.moves and tail cell they match.
+# while the fruit stays put a single move is applied to the field, anything else rebuilds it.
+_fields: "WeakKeyDictionary[Board, Tuple[DistanceField, int, int]]" = WeakKeyDictionary()
+
+
+def _fruit_field(game: GameState) -> DistanceField:
+    board = game_board(game)
+    fruit = board.cell(game.fruit)
+    entry = _fields.get(board)
+    field = None
+    if entry is not None and entry[0].target == fruit and board.describes(game.snake):
+        field, moves, tail = entry
+        if board.moves == moves + 1:
+            if not board.occupied[tail]:
+                field.free(tail)
+            field.occupy(board.head)
+        elif board.moves != moves:
+            field = None
+    if field is None:
+        field = DistanceField(board, fruit)
+    _fields[board] = (field, board.moves, board.tail)
+    return field
+
+
+def _descend(board: Board, field: DistanceField, start: int) -> Optional[List[Tuple[int, int]]]:
+    # the path from start down the field to its target, stepping to the first neighbour in code
+    # order that is one closer. None when start is cut off from the target.
+    distance = field.distance
+    neighbours = board.neighbours
+    nearest = min(neighbours[start * 4 : start * 4 + 4], key=distance.__getitem__)
+    if distance[nearest] >= field.unreachable:
+        return None
+    path = [board.position(start), board.position(nearest)]
+    cell = nearest
+    while distance[cell] > 0:
+        closer = distance[cell] - 1
+        cell = next(neighbor for neighbor in neighbours[cell * 4 : cell * 4 + 4] if distance[neighbor] == closer)
+        path.append(board.position(cell))
+    return path
+
+
+@instrument.probe
+def get_next_direction_gradient(game: GameState) -> Optional[str]:
+    # get_next_direction with the path to the fruit read off a distance field instead of searched.
+    # the path is validated like the searched one, and followed as a plan once it passes.
+    global _branch
+    direction = _planned_direction(game)
+    if direction is not None:
+        _branch = "plan"
+        return direction
+
+    board = game_board(game)
+    path = _descend(board, _fruit_field(game), board.cell(game.snake[0]))
+    if path is not None and _is_path_safe(game, path):
+        _branch = "gradient"
+        if game.board is not None:
+            _plans[board] = (board.moves, game.fruit, tuple(path))
+        return _direction_from_path(board, path)
     return _hamilton_direction(game)
+
+
+class MoveBudget:
+    # the time the anytime solver may spend per move, and how that went
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("the move budget must be positive.")
+        self.seconds = seconds
+        self.moves = 0
+        self.interrupted = 0  # moves whose search ran out of time and followed the cycle instead
+        self.exceeded = 0  # moves that took longer than the budget all the same
+        self.slowest = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {"moves": self.moves, "interrupted": self.interrupted, "exceeded": self.exceeded, "slowest": self.slowest}
+
+
+def format_budget_stats(seconds: float, stats: Sequence[Dict[str, float]]) -> str:
+    # one line for the budgets of all workers together
+    moves = sum(worker["moves"] for worker in stats)
+    interrupted = sum(worker["interrupted"] for worker in stats)
+    exceeded = sum(worker["exceeded"] for worker in stats)
+    slowest = max((worker["slowest"] for worker in stats), default=0.0)
+    return f"move budget {seconds * 1e3:g}ms: {interrupted}/{moves} searches cut short, {exceeded} moves over budget, slowest {slowest * 1e3:.2f}ms"
+
+
+move_budget = MoveBudget(0.01)
+
+
+def use_move_budget(budget: MoveBudget):
+    global move_budget
+    move_budget = budget
+
+
+@instrument.probe
+def get_next_direction_anytime(game: GameState) -> Optional[str]:
+    # get_next_direction within move_budget. the clock is read between the phases of the decision and
+    # every CHECK_EVERY cells inside the searches and look-aheads. once the budget is spent the move
+    # follows the plan if there is one, as the body is only on the hamiltonian cycle at the end of a
+    # path, or else the cycle, if the body lies along it in order. a body that does neither is not
+    # left to the cycle: the decision is finished without a deadline instead. a move still overshoots
+    # by the work done between two looks at the clock, which is what exceeded counts.
+    global _branch
+    budget = move_budget
+    start = time.perf_counter()
+    set_deadline(start + budget.seconds)
+    try:
+        direction = get_next_direction(game)
+    except DeadlineExceeded:
+        set_deadline(None)
+        budget.interrupted += 1
+        if instrument.enabled:
+            instrument.count("budget_interruptions")
+        board = game_board(game)
+        direction = _planned_direction(game)
+        if direction is not None:
+            _branch = "plan"
+        elif _in_cycle_order(board, cycle_index(board.width, board.height)):
+            direction = _hamilton_direction(game)
+            _branch = "budget"
+        else:
+            direction = get_next_direction(game)
+    finally:
+        set_deadline(None)
+    elapsed = time.perf_counter() - start
+    budget.moves += 1
+    budget.exceeded += elapsed > budget.seconds
+    budget.slowest = max(budget.slowest, elapsed)
+    return direction
+
+
+# a solver maps a game state to the next move, or None when it has no move left
+Solver = Callable[[GameState], Optional[str]]
+
+SOLVERS: Dict[str, Solver] = {
+    "astar": get_next_direction,
+    "cycle": get_next_direction_cycle,
+    "hamilton": _hamilton_direction,
+    "gradient": get_next_direction_gradient,
+    "anytime": get_next_direction_anytime,
+    "dynamic": get_next_direction_dynamic,
+}
+
+
+def load_solver(name: str) -> Solver:
+    # a registered name, or "module:function" for solvers that live outside this file
+    if name in SOLVERS:
+        return SOLVERS[name]
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"unknown solver {name!r}, expected one of {sorted(SOLVERS)} or module:function.")
+    solver = getattr(importlib.import_module(module_name), function_name)
+    if not callable(solver):
+        raise ValueError(f"{name} is not callable.")
+    return solver
+
+
+def warm_up(width: int, height: int):
+    # builds the per-board tables the solvers otherwise build on their first move, so timed runs
+    # (and workers forked afterwards) start with them in place. width and height are the board's.
+    if min(width, height) >= 2 and (width % 2 == 0 or height % 2 == 0):
+        cycle_index(width, height)
+        cycle_successors(width, height)
+    a_star_engine(width, height)
+    zobrist_keys(width, height)
@@ -1,12 +1,24 @@
-from dataclasses import dataclass
-from typing import Tuple
+from dataclasses import dataclass, field
+from typing import Optional, Sequence, Tuple
+
+from board import Board
 
 
 @dataclass(frozen=True)
 class GameState:
-    snake: Tuple[Tuple[int, int], ...]
+    # head first. the game loop hands out views of the board (board.SnakeView), so a move costs O(1)
+    # however long the snake is, any other sequence is checked against the board cell by cell.
+    snake: Sequence[Tuple[int, int]]
     fruit: Tuple[Tuple[int, int]]
     direction: str
     score: int
     term_width: int
     term_height: int
+    # advanced in place from state to state, so only the newest state of a game owns an up-to-date board.
+    board: Optional[Board] = field(default=None, compare=False, repr=False)
+
+
+def game_board(game: GameState) -> Board:
+    if game.board is not None and game.board.describes(game.snake):
+        return game.board
+    return Board.from_snake(game.snake, game.term_width - 2, game.term_height - 2)
@@ -0,0 +1,161 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import queue
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import solver
+from snake import advance_game_state, init_game_state
+
+# plays many seeded games per solver at once. every solver plays in worker processes of its own,
+# one per game in flight, which time its moves and report each of them. a move is timed in cpu time
+# of the worker's thread, so processes sharing a core with it do not count against it. a solver that
+# misses the per-move budget, or raises, is disqualified and its processes are terminated, so a
+# solver that never returns does not keep a core busy while the other solvers play on.
+
+
+class Disqualified(Exception):
+    pass
+
+
+@dataclass
+class Entry:
+    name: str
+    games: int = 0
+    wins: int = 0
+    steps: int = 0
+    moves: int = 0
+    think_time: float = 0.0
+    slowest_move: float = 0.0
+    disqualified: Optional[str] = None
+
+    @property
+    def average_steps(self) -> float:
+        return self.steps / self.games if self.games else float("inf")
+
+    @property
+    def moves_per_second(self) -> float:
+        return self.moves / self.think_time if self.think_time else 0.0
+
+
+def _worker(name: str, size: int, seeds: "multiprocessing.Queue", reports: "multiprocessing.Queue"):
+    # plays the seeds it is handed until it gets None, scored like cli_game_loop: the move that ends
+    # the game counts as a step. reports ("start", seed, None) once the game is set up, then
+    # ("move", seed, seconds) per move and ("game", seed, (steps, won)), or ("error", seed, reason).
+    game_solver = solver.load_solver(name)
+    solver.warm_up(size - 2, size - 2)
+    cells = (size - 2) * (size - 2)
+    while (seed := seeds.get()) is not None:
+        try:
+            rng = random.Random(seed)
+            game = init_game_state(size, size, rng)
+            reports.put(("start", seed, None))
+            steps = 0
+            steps_since_last_fruit = 0
+            while True:
+                start = time.thread_time()
+                direction = game_solver(game)
+                reports.put(("move", seed, time.thread_time() - start))
+                steps += 1
+
+                score = game.score
+                next_game = None if direction is None else advance_game_state(game, direction, rng=rng)
+                if next_game is None:
+                    break
+                game = next_game
+                steps_since_last_fruit = 0 if game.score > score else steps_since_last_fruit + 1
+                if steps_since_last_fruit > cells * 2:
+                    break
+            reports.put(("game", seed, (steps, len(game.snake) == cells)))
+        except Exception as error:
+            # a plug-in solver that raises, or whose answer the game cannot take, only loses its own entry
+            reports.put(("error", seed, f"raised {type(error).__name__}: {error}"))
+            return
+
+
+async def _compete(entry: Entry, seeds: Sequence[int], size: int, budget: float, concurrency: int):
+    # a move is judged by the cpu time the worker measured for it. one that has not been reported
+    # twice the budget after the previous one, in wall-clock time, sleeps, blocks or never returns.
+    pending: "multiprocessing.Queue[Optional[int]]" = multiprocessing.Queue()
+    reports: "multiprocessing.Queue[Tuple[str, int, object]]" = multiprocessing.Queue()
+    for seed in seeds:
+        pending.put(seed)
+    workers = [multiprocessing.Process(target=_worker, args=(entry.name, size, pending, reports), daemon=True) for _ in range(max(1, min(concurrency, len(seeds))))]
+    for worker in workers:
+        pending.put(None)
+        worker.start()
+
+    playing: Dict[int, Tuple[int, float]] = {}  # moves made and when the last report came, by seed
+    finished = 0
+    loop = asyncio.get_running_loop()
+    reader = concurrent.futures.ThreadPoolExecutor(1)  # its own thread, so entries never wait on each other's reads
+    try:
+        while finished < len(seeds):
+            now = time.perf_counter()
+            wait = min((heard + 2 * budget - now for _, heard in playing.values()), default=1.0)
+            try:
+                kind, seed, value = await loop.run_in_executor(reader, reports.get, True, max(wait, 0.0))
+            except queue.Empty:
+                now = time.perf_counter()
+                for seed, (moves, heard) in playing.items():
+                    if now - heard > 2 * budget:
+                        raise Disqualified(f"move {moves + 1} of seed {seed} took longer than {budget}s") from None
+                if not playing and all(worker.exitcode is not None for worker in workers):
+                    raise Disqualified("its worker processes died") from None
+                continue
+
+            if kind == "start":
+                playing[seed] = (0, time.perf_counter())
+            elif kind == "move":
+                moves = playing[seed][0] + 1
+                entry.moves += 1
+                entry.think_time += value
+                entry.slowest_move = max(entry.slowest_move, value)
+                if value > budget:
+                    raise Disqualified(f"move {moves} of seed {seed} took longer than {budget}s")
+                playing[seed] = (moves, time.perf_counter())
+            elif kind == "game":
+                steps, won = value
+                entry.games += 1
+                entry.steps += steps
+                entry.wins += won
+                del playing[seed]
+                finished += 1
+            else:
+                raise Disqualified(value)
+    except Disqualified as reason:
+        entry.disqualified = str(reason)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+        reader.shutdown()
+
+
+async def run_tournament(solvers: Sequence[str], seeds: Sequence[int], size: int, budget: float, concurrency: int) -> List[Entry]:
+    # all solvers play all seeds, concurrency games per solver at a time. returns the ranking.
+    names = list(dict.fromkeys(solvers))
+    for name in names:
+        solver.load_solver(name)  # unknown names fail here, before any worker starts
+    entries = [Entry(name) for name in names]
+    await asyncio.gather(*(_compete(entry, seeds, size, budget, concurrency) for entry in entries))
+    return rank(entries)
+
+
+def rank(entries: Sequence[Entry]) -> List[Entry]:
+    # disqualified solvers last, then most wins, fewest average steps and fastest decisions
+    return sorted(entries, key=lambda entry: (entry.disqualified is not None, -entry.wins, entry.average_steps, -entry.moves_per_second))
+
+
+def format_ranking(entries: Sequence[Entry]) -> str:
+    lines = [f"{'#':>2} {'solver':<24} {'wins':>9} {'avg steps':>10} {'moves/s':>10} {'slowest ms':>10}"]
+    for place, entry in enumerate(entries, 1):
+        if entry.disqualified:
+            lines.append(f"{place:>2} {entry.name:<24} disqualified: {entry.disqualified}")
+            continue
+        lines.append(f"{place:>2} {entry.name:<24} {entry.wins:>4}/{entry.games:<4} {entry.average_steps:>10.1f} {entry.moves_per_second:>10.0f} {entry.slowest_move * 1e3:>10.2f}")
+    return "\n".join(lines)
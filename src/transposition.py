@@ -0,0 +1,67 @@
+import sys
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Sequence
+
+EVICTIONS = ("lru", "fifo")
+
+
+def _size(value: object) -> int:
+    # bytes held by a value, following tuples (paths are tuples of position tuples)
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(_size(item) for item in value)
+    return sys.getsizeof(value) if value is not None else 0
+
+
+class TranspositionTable:
+    # bounded map from position hashes to solver decisions. once full, "lru" evicts the entry that
+    # was looked up least recently and "fifo" the one that was stored first.
+
+    def __init__(self, capacity: int, eviction: str = "lru"):
+        if capacity <= 0:
+            raise ValueError("the table needs room for at least one entry.")
+        if eviction not in EVICTIONS:
+            raise ValueError(f"unknown eviction policy {eviction!r}, expected one of {EVICTIONS}.")
+        self.capacity = capacity
+        self.eviction = eviction
+        self.entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self.entry_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[object]:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.eviction == "lru":
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: object):
+        if key in self.entries:
+            self.entry_bytes -= _size(key) + _size(self.entries.pop(key))
+        elif len(self.entries) >= self.capacity:
+            old_key, old_value = self.entries.popitem(last=False)
+            self.entry_bytes -= _size(old_key) + _size(old_value)
+            self.evictions += 1
+        self.entries[key] = value
+        self.entry_bytes += _size(key) + _size(value)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": sys.getsizeof(self.entries) + self.entry_bytes,
+        }
+
+
+def format_stats(stats: Sequence[Dict[str, int]]) -> str:
+    # one line for the tables of all workers together
+    total = {name: sum(worker[name] for worker in stats) for name in ("hits", "misses", "evictions", "entries", "bytes")}
+    lookups = total["hits"] + total["misses"]
+    rate = total["hits"] / lookups if lookups else 0.0
+    return f"transposition table: {total['hits']}/{lookups} hits ({rate:.1%}), {total['entries']} entries in {total['bytes'] / 1e6:.1f}MB, {total['evictions']} evictions"
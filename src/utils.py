@@ -1,7 +1,13 @@
 import heapq
-from typing import List, Optional, Tuple
+import threading
+import time
+from array import array
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
 
-from state import GameState
+import instrument
+from board import Board, neighbour_table
+from state import GameState, game_board
 
 
 def dist(a: Tuple[int, int], b: Tuple[int, int]) -> int:
@@ -9,90 +15,302 @@ def dist(a: Tuple[int, int], b: Tuple[int, int]) -> int:
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
 
-def a_star_search(game: GameState, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
-    width = game.term_width - 2
-    height = game.term_height - 2
+class DeadlineExceeded(Exception):
+    # raised by a search once the deadline set for the current move on its thread has passed
+    pass
 
-    # the set of nodes already evaluated
-    closed_set = set()
 
-    # the set of currently discovered nodes that are not evaluated yet.
-    # initially, only the start node is known.
-    open_set = [(0, start)]  # (f_score, node)
+CHECK_EVERY = 64  # cells a search handles between two looks at the clock
+_deadlines = threading.local()
 
-    # for each node, which node it can most efficiently be reached from.
-    # if a node can be reached from many nodes, came_from will eventually contain the most efficient previous step.
-    came_from = {}
 
-    # for each node, the cost of getting from the start node to that node.
-    g_score = {(x, y): float("inf") for x in range(1, width + 1) for y in range(1, height + 1)}
-    g_score[start] = 0
+def set_deadline(deadline: Optional[float]):
+    # a time.perf_counter() value the searches on this thread give up after, None for no limit
+    _deadlines.value = deadline
 
-    # for each node, the total cost of getting from the start node to the goal by passing by that node. that value is partly known, partly heuristic.
-    f_score = {(x, y): float("inf") for x in range(1, width + 1) for y in range(1, height + 1)}
-    f_score[start] = dist(start, goal)
 
-    while open_set:
-        _, current = heapq.heappop(open_set)
+def _deadline() -> Optional[float]:
+    return getattr(_deadlines, "value", None)
 
-        if current == goal:
-            path = []
-            while current in came_from:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            return path[::-1]
 
-        closed_set.add(current)
+def check_deadline():
+    # raises DeadlineExceeded if the deadline on this thread has passed. the searches call it on
+    # entry and every CHECK_EVERY cells, the solvers between the phases of a decision.
+    deadline = _deadline()
+    if deadline is not None and time.perf_counter() > deadline:
+        raise DeadlineExceeded
 
-        for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            neighbor = (current[0] + dx, current[1] + dy)
 
-            if not (1 <= neighbor[0] <= width and 1 <= neighbor[1] <= height):
-                continue
+def _columns(width: int, height: int) -> array:
+    # column of every cell id, built a column at a time so large boards do not take a python step per cell
+    columns = array("i")
+    for column in range(width):
+        columns.extend(array("i", (column,)) * height)
+    return columns
 
-            if neighbor in closed_set:
-                continue
 
-            # don't run into the snake's body
-            # we allow the path to go to the tail, because it will move
-            if neighbor in game.snake and neighbor != game.snake[-1]:
+class AStar:
+    # a* search over one board size, built once and reused for every search on that size.
+    # scores live in flat arrays that are invalidated by bumping a generation counter instead of
+    # being refilled, and improved nodes are pushed again with stale heap entries skipped on pop.
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        size = width * height
+        self.columns = _columns(width, height)
+        self.rows = array("i", range(height)) * width
+        self.neighbours = neighbour_table(width, height)
+        self.g_score = array("i", bytes(4 * size))
+        self.came_from = array("i", bytes(4 * size))
+        self.scored = array("q", bytes(8 * size))  # generation in which g_score and came_from were last set
+        self.closed = array("q", bytes(8 * size))  # generation in which the cell was expanded
+        self.generation = 0
+        self.expanded = 0  # nodes expanded by the last search
+
+    def search(self, occupied: bytearray, start: int, goal: int, tail: int) -> Optional[List[int]]:
+        # returns the cells from start to goal, or None. occupied cells are walls except for the tail, which will move.
+        # heap entries are (f_score, cell) and cell ids sort like (x, y) tuples, so ties break as in the tuple-based search.
+        self.generation += 1
+        generation = self.generation
+        columns = self.columns
+        rows = self.rows
+        neighbours = self.neighbours
+        g_score = self.g_score
+        came_from = self.came_from
+        scored = self.scored
+        closed = self.closed
+        goal_column = columns[goal]
+        goal_row = rows[goal]
+        check_deadline()
+        deadline = _deadline()
+        expanded = 0
+
+        g_score[start] = 0
+        scored[start] = generation
+        open_set = [(0, start)]
+
+        while open_set:
+            _, current = heapq.heappop(open_set)
+
+            if closed[current] == generation:
                 continue
 
+            if current == goal:
+                self.expanded = expanded
+                path = [current]
+                while current != start:
+                    current = came_from[current]
+                    path.append(current)
+                return path[::-1]
+
+            closed[current] = generation
+            expanded += 1
+            if deadline is not None and expanded % CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                self.expanded = expanded
+                raise DeadlineExceeded
             tentative_g_score = g_score[current] + 1
 
-            if tentative_g_score < g_score.get(neighbor, float("inf")):
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = g_score[neighbor] + dist(neighbor, goal)
-                if (f_score[neighbor], neighbor) not in open_set:
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+            # same neighbour order as the tuple-based search: down, up, right, left. wall sides
+            # point back at current, which is closed.
+            base = current * 4
+            for neighbor in neighbours[base : base + 4]:
+                if closed[neighbor] == generation:
+                    continue
+
+                if occupied[neighbor] and neighbor != tail:
+                    continue
+
+                if scored[neighbor] != generation or tentative_g_score < g_score[neighbor]:
+                    scored[neighbor] = generation
+                    g_score[neighbor] = tentative_g_score
+                    came_from[neighbor] = current
+                    f_score = tentative_g_score + abs(columns[neighbor] - goal_column) + abs(rows[neighbor] - goal_row)
+                    heapq.heappush(open_set, (f_score, neighbor))
+
+        self.expanded = expanded
+        return None
+
+
+@lru_cache(maxsize=None)
+def _a_star_engine(width: int, height: int, thread: int) -> AStar:
+    return AStar(width, height)
+
+
+def a_star_engine(width: int, height: int) -> AStar:
+    # one engine per board size and thread, solvers running side by side never share search arrays
+    return _a_star_engine(width, height, threading.get_ident())
+
+
+@instrument.probe
+def a_star_search(game: GameState, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
+    board = game_board(game)
+    engine = a_star_engine(board.width, board.height)
+    path = engine.search(board.occupied, board.cell(start), board.cell(goal), board.cell(game.snake[-1]))
+    if instrument.enabled:
+        instrument.observe("a_star_search nodes expanded", engine.expanded)
+    if path is None:
+        return None
+    return [board.position(cell) for cell in path]
+
+
+class FloodFill:
+    # breadth-first flood fill over one board size, reused like AStar. the queue is a flat array
+    # walked with a read index, and visited marks are generation stamps.
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        size = width * height
+        self.neighbours = neighbour_table(width, height)
+        self.queue = array("i", bytes(4 * size))
+        self.depth = array("i", bytes(4 * size))
+        self.visited = array("q", bytes(8 * size))
+        self.generation = 0
+
+    def count(self, blocked: Sequence[int], start: int, limit: Optional[int] = None, timed: bool = False) -> int:
+        # counts the cells reachable from start (start included), stopping early once limit is reached.
+        # blocked is an occupancy grid, or with timed=True the number of moves until each cell is free,
+        # so a cell first reached after d moves is open once blocked[cell] <= d.
+        self.generation += 1
+        generation = self.generation
+        neighbours = self.neighbours
+        queue = self.queue
+        depth = self.depth
+        visited = self.visited
+        check_deadline()
+        deadline = _deadline()
+
+        queue[0] = start
+        depth[start] = 0
+        visited[start] = generation
+        head = 0
+        tail = 1
+        while head < tail:
+            cell = queue[head]
+            head += 1
+            if head == limit:
+                return head
+            if deadline is not None and head % CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                raise DeadlineExceeded
+            next_depth = depth[cell] + 1
+            base = cell * 4
+            for neighbor in neighbours[base : base + 4]:
+                if visited[neighbor] == generation:
+                    continue
+                if blocked[neighbor] > (next_depth if timed else 0):
+                    continue
+                visited[neighbor] = generation
+                depth[neighbor] = next_depth
+                queue[tail] = neighbor
+                tail += 1
+        return head
+
+
+@lru_cache(maxsize=None)
+def _flood_fill_engine(width: int, height: int, thread: int) -> FloodFill:
+    return FloodFill(width, height)
+
 
-    return None
+def flood_fill_engine(width: int, height: int) -> FloodFill:
+    return _flood_fill_engine(width, height, threading.get_ident())
 
 
-def count_reachable_cells(game: GameState, start: Tuple[int, int]) -> int:
+@instrument.probe
+def count_reachable_cells(game: GameState, start: Tuple[int, int], limit: Optional[int] = None, timed: bool = False) -> int:
     # counts the number of reachable cells from a starting point using bfs.
-    width = game.term_width - 2
-    height = game.term_height - 2
-    q = [start]
-    visited = {start}
-    count = 0
-    while q:
-        cell = q.pop(0)
-        count += 1
-        for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            neighbor = (cell[0] + dx, cell[1] + dy)
-
-            if not (1 <= neighbor[0] <= width and 1 <= neighbor[1] <= height):
-                continue
+    # timed treats body cells as free once the tail has moved off them, assuming the snake does not grow.
+    board = game_board(game)
+    engine = flood_fill_engine(board.width, board.height)
+    blocked = board.vacate_times() if timed else board.occupied
+    return engine.count(blocked, board.cell(start), limit, timed)
 
-            if neighbor in visited:
-                continue
 
-            if neighbor in game.snake:
-                continue
+class DistanceField:
+    # breadth-first distances from every free cell to one target cell, e.g. the fruit, kept up to
+    # date while the board changes instead of being searched again. occupied and cut-off cells hold
+    # the board size. a freed cell can only shorten distances, so it spreads its own outwards. an
+    # occupied cell lengthens exactly the distances whose every shortest route ran through it: those
+    # cells are found level by level, cleared, and refilled from the cells around them that kept theirs.
+    # the field reads the board's occupancy grid, and free() and occupy() are called after the board
+    # has changed.
+
+    def __init__(self, board: Board, target: int):
+        self.neighbours = board.neighbours
+        self.occupied = board.occupied
+        self.unreachable = board.size
+        self.target = target
+        self.distance = array("i", (board.size,)) * board.size
+        if not self.occupied[target]:
+            self.distance[target] = 0
+            self._spread([target])
+
+    def _spread(self, queue: List[int]):
+        # lowers the distances around queued cells, whose own distances are final, breadth first
+        distance = self.distance
+        neighbours = self.neighbours
+        occupied = self.occupied
+        head = 0
+        while head < len(queue):
+            cell = queue[head]
+            head += 1
+            next_distance = distance[cell] + 1
+            for neighbor in neighbours[cell * 4 : cell * 4 + 4]:
+                if next_distance < distance[neighbor] and not occupied[neighbor]:
+                    distance[neighbor] = next_distance
+                    queue.append(neighbor)
 
-            visited.add(neighbor)
-            q.append(neighbor)
-    return count
+    def free(self, cell: int):
+        distance = self.distance
+        if cell == self.target:
+            distance[cell] = 0
+        else:
+            distance[cell] = min(distance[neighbor] for neighbor in self.neighbours[cell * 4 : cell * 4 + 4]) + 1
+        if distance[cell] < self.unreachable:
+            self._spread([cell])
+        else:
+            distance[cell] = self.unreachable
+
+    def occupy(self, cell: int):
+        distance = self.distance
+        neighbours = self.neighbours
+        unreachable = self.unreachable
+        level = distance[cell]
+        distance[cell] = unreachable
+        if level >= unreachable:
+            return
+
+        # a cell one step further out loses its distance when no neighbour one step closer kept one.
+        # a whole level is cleared before the next is looked at, so no cleared cell is taken as support.
+        lost = []
+        frontier = [cell]
+        while frontier:
+            found = []
+            for current in frontier:
+                for neighbor in neighbours[current * 4 : current * 4 + 4]:
+                    if distance[neighbor] != level + 1:
+                        continue
+                    if level not in [distance[other] for other in neighbours[neighbor * 4 : neighbor * 4 + 4]]:
+                        distance[neighbor] = unreachable
+                        found.append(neighbor)
+            lost.extend(found)
+            frontier = found
+            level += 1
+
+        # refill the cleared cells from their best remaining neighbours, nearest first
+        heap = []
+        for current in lost:
+            best = min(distance[neighbor] for neighbor in neighbours[current * 4 : current * 4 + 4]) + 1
+            if best < unreachable:
+                distance[current] = best
+                heap.append((best, current))
+        heapq.heapify(heap)
+        occupied = self.occupied
+        while heap:
+            current_distance, current = heapq.heappop(heap)
+            if current_distance != distance[current]:
+                continue
+            for neighbor in neighbours[current * 4 : current * 4 + 4]:
+                if current_distance + 1 < distance[neighbor] and not occupied[neighbor]:
+                    distance[neighbor] = current_distance + 1
+                    heapq.heappush(heap, (current_distance + 1, neighbor))
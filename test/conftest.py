@@ -1,4 +1,27 @@
+import os
 import sys
+import tempfile
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+# keep the on-disk cycle cache of the test runs out of the user's cache directory
+os.environ["SNAKE_CACHE_DIR"] = tempfile.mkdtemp(prefix="snake-test-cache-")
+
+
+# the noisier timing tests of test_scaling.py are marked slow and only run when asked for with --slow
+def pytest_addoption(parser):
+    parser.addoption("--slow", action="store_true", help="also run the timing tests marked slow")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: timing test, deselected unless --slow is given")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--slow"):
+        return
+    slow = [item for item in items if item.get_closest_marker("slow")]
+    if slow:
+        config.hook.pytest_deselected(items=slow)
+        items[:] = [item for item in items if not item.get_closest_marker("slow")]
@@ -0,0 +1,24 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch import BatchGames, play_batches  # noqa: E402
+
+
+def test_batch_games_win():
+    games = BatchGames(16, 6, 4, np.random.default_rng(0)).run()
+    assert games.won.all()
+    assert (games.length == 24).all()
+    assert (games.score == 21).all()
+
+
+def test_batch_games_opening_snake():
+    games = BatchGames(2, 8, 8, np.random.default_rng(0))
+    assert games.occupied.sum(axis=1).tolist() == [3, 3]
+    assert games.body[0, :3].tolist() == [36, 28, 20]  # (5, 5), (4, 5), (3, 5)
+    assert not games.occupied[np.arange(2), games.fruit].any()
+
+
+def test_play_batches_covers_all_runs():
+    batches = list(play_batches(5, 2, 4, 4, seed=1))
+    assert [games.count for games in batches] == [2, 2, 1]
@@ -0,0 +1,49 @@
+import pytest
+
+from benchmark import compare, load_results, save_results, summarize
+
+
+def _record(seed, steps, won=True, time_per_step=1e-4):
+    return {
+        "size": 10,
+        "solver": "astar",
+        "seed": seed,
+        "steps": steps,
+        "won": won,
+        "steps_to_win": steps if won else None,
+        "time_per_step": time_per_step,
+        "decisions_per_second": 1 / time_per_step,
+        "p50_latency": time_per_step,
+        "p95_latency": time_per_step,
+        "p99_latency": time_per_step,
+        "peak_memory_kb": 20000,
+    }
+
+
+def test_summarize_averages_steps_to_win_across_seeds():
+    summary = summarize([_record(0, 100), _record(1, 300), _record(2, 500, won=False)])
+    assert summary == [{"size": 10, "solver": "astar", "games": 3, "wins": 2, "mean_steps_to_win": 200}]
+
+
+def test_compare_flags_a_known_regression():
+    baseline = [_record(0, 100), _record(1, 300), _record(2, 200)]
+    assert compare(baseline, baseline, 0.2) == []
+
+    results = [_record(0, 100, time_per_step=2e-4), _record(1, 300, won=False, time_per_step=2e-4), _record(2, 200)]
+    regressions = compare(results, baseline, 0.2)
+    assert "10x10 astar: median time_per_step 0.0001 -> 0.0002 (100% worse)" in regressions
+    assert "10x10 astar: won 2/3 games, 3/3 before" in regressions
+    assert compare([_record(0, 115), _record(1, 400), _record(2, 260)], baseline, 0.2) == ["10x10 astar: median steps_to_win 200 -> 260 (30% worse)"]
+
+
+def test_compare_ignores_a_single_slow_seed():
+    baseline = [_record(0, 100), _record(1, 300), _record(2, 200)]
+    assert compare([_record(0, 100, time_per_step=5e-4), _record(1, 300), _record(2, 200)], baseline, 0.2) == []
+
+
+@pytest.mark.parametrize("name", ["results.json", "results.csv"])
+def test_results_survive_a_round_trip(tmp_path, name):
+    results = [_record(0, 100), _record(1, 300, won=False)]
+    path = str(tmp_path / name)
+    save_results(path, results)
+    assert load_results(path) == results
@@ -0,0 +1,142 @@
+import random
+
+import pytest
+
+from board import DIRECTIONS, DOWN, LEFT, RIGHT, UP, Board, opposite
+
+
+def test_board_from_snake():
+    snake = ((3, 2), (2, 2), (1, 2))
+    board = Board.from_snake(snake, 4, 3)
+
+    assert board.snake() == snake
+    assert board.length == 3
+    assert board.position(board.head) == (3, 2)
+    assert board.position(board.tail) == (1, 2)
+    assert sum(board.occupied) == 3
+
+
+def test_board_cell_order_matches_tuple_order():
+    board = Board(5, 4)
+    positions = sorted((x, y) for x in range(1, 6) for y in range(1, 5))
+    assert [board.cell(p) for p in positions] == list(range(board.size))
+    assert [board.position(c) for c in range(board.size)] == positions
+
+
+def test_board_advance():
+    board = Board.from_snake(((2, 1), (1, 1)), 3, 3)
+
+    board.advance(board.cell((3, 1)), grow=False)
+    assert board.snake() == ((3, 1), (2, 1))
+    assert not board.is_occupied((1, 1))
+
+    board.advance(board.cell((3, 2)), grow=True)
+    assert board.snake() == ((3, 2), (3, 1), (2, 1))
+    assert board.is_occupied((2, 1))
+
+
+def test_board_ring_buffer_wraps():
+    board = Board.from_snake(((1, 1),), 2, 2)
+    for position in [(2, 1), (2, 2), (1, 2), (1, 1), (2, 1)]:
+        board.advance(board.cell(position), grow=False)
+    assert board.snake() == ((2, 1),)
+    assert sum(board.occupied) == 1
+
+
+def test_snake_view_outlives_moves_until_its_slots_are_reused():
+    board = Board.from_snake(((2, 1), (1, 1)), 2, 2)
+    view = board.view()
+    assert view == ((2, 1), (1, 1)) and view[-1] == (1, 1) and view[1:] == ((1, 1),)
+    assert board.describes(view) and board.describes(((2, 1), (1, 1)))
+
+    board.advance(board.cell((2, 2)), grow=False)
+    assert not board.describes(view) and not board.describes(((2, 1), (1, 1)))
+    assert board.view() == ((2, 2), (2, 1))
+    # the two free slots of the 2x2 ring buffer last two pushes
+    board.advance(board.cell((1, 2)), grow=False)
+    assert view == ((2, 1), (1, 1))
+    board.advance(board.cell((1, 1)), grow=False)
+    with pytest.raises(ValueError):
+        list(view)
+
+
+def test_board_rollback_restores_every_slot():
+    board = Board.from_snake(((3, 2), (2, 2), (1, 2)), 4, 4)
+    board.zobrist()
+    view = board.view()
+    before = (bytes(board.occupied), bytes(board.body), bytes(board.body_slot), bytes(board.free), bytes(board.free_slot), board.head_slot, board.free_count, board.hash)
+
+    checkpoint = board.checkpoint()
+    for position, grow in [((4, 2), False), ((4, 3), True), ((3, 3), False), ((2, 3), True), ((1, 3), False), ((1, 2), False)]:
+        board.advance(board.cell(position), grow)
+    board.rollback(checkpoint)
+
+    assert (bytes(board.occupied), bytes(board.body), bytes(board.body_slot), bytes(board.free), bytes(board.free_slot), board.head_slot, board.free_count, board.hash) == before
+    assert board.moves == 0 and board.journal is None
+    assert board.describes(view) and view == ((3, 2), (2, 2), (1, 2))
+
+
+def test_board_free_cells_track_body():
+    board = Board.from_snake(((2, 1), (1, 1)), 3, 3)
+    for position, grow in [((3, 1), False), ((3, 2), True), ((2, 2), False), ((1, 2), True)]:
+        board.advance(board.cell(position), grow)
+        free = set(board.free[: board.free_count])
+        assert free == {cell for cell in range(board.size) if not board.occupied[cell]}
+        assert all(board.free[board.free_slot[cell]] == cell for cell in range(board.size))
+
+
+def test_board_random_free_cell():
+    rng = random.Random(0)
+    board = Board.from_snake(((2, 1), (1, 1)), 2, 1)
+    assert board.random_free_cell(rng) is None
+
+    board = Board.from_snake(((2, 2), (2, 1), (1, 1)), 2, 2)
+    assert {board.random_free_cell(rng) for _ in range(10)} == {(1, 2)}
+
+
+def test_board_zobrist_is_updated_incrementally():
+    rng = random.Random(5)
+    board = Board.from_snake(((3, 3), (2, 3), (1, 3)), 6, 6)
+    board.zobrist()
+    for _ in range(200):
+        x, y = board.position(board.head)
+        moves = [(x + dx, y + dy) for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0))]
+        moves = [p for p in moves if board.contains(p) and (not board.is_occupied(p) or board.cell(p) == board.tail)]
+        if not moves:
+            break
+        target = board.cell(rng.choice(moves))
+        grow = target != board.tail and rng.random() < 0.2
+        board.advance(target, grow)
+        fresh = Board.from_snake(board.snake(), 6, 6)
+        assert board.zobrist() == fresh.zobrist()
+        assert board.zobrist((1, 1)) == fresh.zobrist((1, 1))
+
+
+def test_board_zobrist_depends_on_body_order_and_fruit():
+    # same cells, heads at opposite ends
+    forward = Board.from_snake(((1, 1), (2, 1), (2, 2), (1, 2)), 3, 3)
+    backward = Board.from_snake(((1, 2), (2, 2), (2, 1), (1, 1)), 3, 3)
+    assert forward.zobrist() != backward.zobrist()
+    assert forward.zobrist((3, 3)) != forward.zobrist((3, 1))
+
+
+def test_board_offset_counts_from_head():
+    board = Board.from_snake(((3, 1), (2, 1), (1, 1)), 4, 4)
+    board.advance(board.cell((4, 1)), grow=False)
+    board.advance(board.cell((4, 2)), grow=True)
+    assert [board.offset(cell) for cell in board.cells()] == list(range(board.length))
+    assert board.offset(board.tail) == board.length - 1
+
+
+def test_board_neighbours_stay_on_the_board():
+    board = Board(3, 2)
+    for cell in range(board.size):
+        x, y = board.position(cell)
+        for code, (dx, dy) in zip((DOWN, UP, RIGHT, LEFT), ((0, 1), (0, -1), (1, 0), (-1, 0))):
+            neighbour = (x + dx, y + dy)
+            assert board.step(cell, code) == (board.cell(neighbour) if board.contains(neighbour) else cell)
+
+    assert board.direction(board.cell((1, 1)), board.cell((2, 1))) == RIGHT
+    assert board.direction(board.cell((1, 1)), board.cell((1, 1))) is None
+    assert board.direction(board.cell((1, 1)), board.cell((2, 2))) is None
+    assert [DIRECTIONS[opposite(code)] for code in range(4)] == ["KEY_UP", "KEY_DOWN", "KEY_LEFT", "KEY_RIGHT"]
@@ -0,0 +1,76 @@
+import os
+import time
+
+import pytest
+
+import cycle
+from board import Board
+from cycle import cycle_index, cycle_successors, hamilton_cycle
+
+
+@pytest.mark.parametrize("width,height", [(4, 4), (6, 3), (5, 4), (3, 6), (7, 10), (2, 2)])
+def test_hamilton_cycle_visits_every_cell_once(width, height):
+    board = Board(width, height)
+    order = hamilton_cycle(width, height)
+    assert sorted(order) == list(range(board.size))
+    for position, cell in enumerate(order):
+        (x, y), (nx, ny) = board.position(cell), board.position(order[position + 1 - board.size])
+        assert abs(x - nx) + abs(y - ny) == 1
+        assert cycle_index(width, height)[cell] == position
+        assert cycle_successors(width, height)[cell] == order[position + 1 - board.size]
+
+
+@pytest.mark.parametrize("width,height", [(5, 5), (3, 7), (1, 4), (6, 1)])
+def test_hamilton_cycle_needs_an_even_side(width, height):
+    with pytest.raises(ValueError):
+        hamilton_cycle(width, height)
+
+
+def test_hamilton_cycle_is_read_back_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAKE_CACHE_DIR", str(tmp_path))
+    cycle._tables.cache_clear()
+    order = hamilton_cycle(8, 5)
+    index, successors = cycle_index(8, 5), cycle_successors(8, 5)
+    assert os.path.exists(tmp_path / f"cycle-v{cycle.CACHE_VERSION}-8x5.bin")
+
+    def fail(*args):
+        raise AssertionError("tables rebuilt")
+
+    monkeypatch.setattr(cycle, "_generate", fail)
+    monkeypatch.setattr(cycle, "_index", fail)
+    monkeypatch.setattr(cycle, "_successors", fail)
+    cycle._tables.cache_clear()
+    assert (hamilton_cycle(8, 5), cycle_index(8, 5), cycle_successors(8, 5)) == (order, index, successors)
+    cycle._tables.cache_clear()
+
+
+def test_a_damaged_cache_file_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAKE_CACHE_DIR", str(tmp_path))
+    cycle._tables.cache_clear()
+    order = hamilton_cycle(4, 6)
+    path = tmp_path / f"cycle-v{cycle.CACHE_VERSION}-4x6.bin"
+    stored = path.read_bytes()
+    header = cycle._HEADER.size
+    flipped = stored[: header + 20] + bytes([stored[header + 20] ^ 1]) + stored[header + 21 :]
+    other_board = cycle._HEADER.pack(cycle._MAGIC, cycle.CACHE_VERSION, 6, 4, *cycle._HEADER.unpack(stored[:header])[4:]) + stored[header:]
+    for damaged in (flipped, stored[:-4], stored[:header], other_board, b""):
+        path.write_bytes(damaged)
+        cycle._tables.cache_clear()
+        assert hamilton_cycle(4, 6) == order
+        assert path.read_bytes() == stored
+    cycle._tables.cache_clear()
+
+
+def test_a_cached_start_is_faster_than_a_cold_one(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAKE_CACHE_DIR", str(tmp_path))
+
+    def start() -> float:
+        cycle._tables.cache_clear()
+        began = time.process_time()
+        hamilton_cycle(300, 300), cycle_index(300, 300), cycle_successors(300, 300)
+        return time.process_time() - began
+
+    cold = start()
+    cached = start()
+    cycle._tables.cache_clear()
+    assert cached < cold / 4, (cached, cold)
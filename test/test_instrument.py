@@ -0,0 +1,32 @@
+import instrument
+import utils
+from state import GameState
+
+
+def test_probe_is_free_until_enabled():
+    assert utils.a_star_search.__name__ == "a_star_search"
+    assert not hasattr(utils.a_star_search, "__wrapped__")
+
+
+def test_enable_times_probed_calls(tmp_path):
+    game = GameState(snake=((2, 2),), fruit=(4, 4), direction="KEY_RIGHT", score=0, term_width=7, term_height=7)
+    original = utils.a_star_search
+    instrument.reset()
+    instrument.enable()
+    try:
+        assert utils.a_star_search is not original
+        utils.a_star_search(game, (2, 2), (4, 4))
+        utils.count_reachable_cells(game, (1, 1))
+    finally:
+        instrument.disable()
+
+    assert utils.a_star_search is original
+    assert instrument.timings["a_star_search"].count == 1
+    assert instrument.timings["count_reachable_cells"].count == 1
+    assert instrument.values["a_star_search nodes expanded"].count == 1
+    assert "a_star_search" in instrument.summary()
+
+    path = tmp_path / "stacks.txt"
+    instrument.write_stacks(str(path))
+    assert {line.split()[0] for line in path.read_text().splitlines()} == {"a_star_search", "count_reachable_cells"}
+    instrument.reset()
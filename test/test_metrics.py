@@ -0,0 +1,41 @@
+import csv
+import json
+import random
+
+import pytest
+
+from metrics import EventSink
+from snake import cli_game_loop, init_game_state, stream_game
+from solver import get_next_direction, get_next_direction_cycle
+
+
+def test_stream_game_matches_cli_game_loop():
+    random.seed(4)
+    final, steps = cli_game_loop(init_game_state(8, 8), get_next_direction)
+    random.seed(4)
+    stream = stream_game(init_game_state(8, 8), get_next_direction)
+    events = []
+    with pytest.raises(StopIteration) as finished:
+        while True:
+            events.append(next(stream))
+    streamed, streamed_steps = finished.value.value
+
+    assert (streamed.snake, streamed_steps) == (final.snake, steps)
+    assert [event.step for event in events] == list(range(1, steps + 1))
+    assert events[-1].score == final.score
+    assert {event.branch for event in events} <= {"plan", "astar", "hamilton"}
+
+
+@pytest.mark.parametrize("name", ["events.jsonl", "events.csv"])
+def test_event_sink_flushes_in_chunks(tmp_path, name):
+    path = str(tmp_path / name)
+    random.seed(1)
+    with EventSink(path, buffer_size=16) as sink:
+        final, steps = sink.write_game(3, stream_game(init_game_state(8, 8), get_next_direction_cycle, max_steps=50))
+        assert len(sink.rows) < 16
+    assert steps == 50 and sink.written == 50
+
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f)) if name.endswith(".csv") else [json.loads(line) for line in f]
+    assert len(rows) == 50
+    assert str(rows[0]["run"]) == "3" and rows[-1]["branch"] in ("cycle", "shortcut")
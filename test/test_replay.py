@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from replay import DIRECTION_CODES, Recorder, read_replay
+from snake import cli_game_loop, init_game_state, replay_game_states, verify_replay
+from solver import get_next_direction_cycle
+
+
+def test_replay_roundtrip(tmp_path, monkeypatch):
+    # small chunks, so the game spans several of them and ends on a partly filled byte
+    monkeypatch.setattr(Recorder, "CHUNK_MOVES", 64)
+    path = str(tmp_path / "run.replay")
+    random.seed(3)
+    initial = init_game_state(8, 8)
+    with Recorder(path, initial, 3, "cycle") as recorder:
+        final, steps = cli_game_loop(initial, get_next_direction_cycle, recorder=recorder)
+
+    replay = read_replay(path)
+    assert (replay.seed, replay.solver, replay.term_width, replay.term_height) == (3, "cycle", 8, 8)
+    assert replay.steps == recorder.steps == steps - 1
+    assert replay.steps % 4 != 0
+
+    states = list(replay_game_states(replay))
+    assert states[0].snake == initial.snake and states[0].fruit == initial.fruit
+    assert states[-1].snake == final.snake and states[-1].score == final.score
+
+    replayed, agreed = verify_replay(read_replay(path), get_next_direction_cycle)
+    assert replayed.snake == final.snake
+    assert agreed == replay.steps
+
+
+def test_replay_rejects_illegal_moves(tmp_path):
+    path = str(tmp_path / "run.replay")
+    random.seed(0)
+    game = init_game_state(8, 8)
+    with Recorder(path, game, None, "astar") as recorder:
+        for _ in range(4):
+            recorder.record(game, False)  # keeps heading right into the wall
+    replay = read_replay(path)
+    assert replay.seed is None
+    with pytest.raises(ValueError):
+        list(replay_game_states(replay))
+
+
+def test_replay_direction_codes_are_frozen():
+    # version 1 files store these codes, whatever numbering the board uses
+    assert DIRECTION_CODES == {"KEY_UP": 0, "KEY_DOWN": 1, "KEY_LEFT": 2, "KEY_RIGHT": 3}
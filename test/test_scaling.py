@@ -0,0 +1,140 @@
+import math
+import time
+from typing import Callable, Optional, Sequence, Tuple
+
+import pytest
+
+import solver
+from board import DIRECTIONS, Board
+from cycle import hamilton_cycle
+from snake import update_game_state
+from state import GameState
+from utils import a_star_search, count_reachable_cells
+
+# times the hot paths on growing boards and snakes, fits log(time) against log(size) and fails when
+# the slope exceeds the expected exponent by more than MARGIN. the best of a few repeats is taken
+# so that a busy machine only slows a measurement down, it rarely makes one look faster. linear
+# paths measure around 1.2 here, as larger boards fall out of the cpu caches, while a quadratic
+# one would measure 2. times are cpu times of this process, so parallel runs sharing a core do not
+# inflate them. the cheapest checks run by default with a wider margin, which still fails a path
+# that grows by a whole power of the size, and the noisier ones only run with --slow.
+
+REPEATS = 5
+MARGIN = 0.6
+WIDE_MARGIN = 0.8
+
+
+def _best(setup: Callable[[], object], run: Callable[[object], object], repeats: int = REPEATS) -> float:
+    best = math.inf
+    for _ in range(repeats):
+        argument = setup()
+        start = time.process_time()
+        run(argument)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def _slope(sizes: Sequence[int], times: Sequence[float]) -> float:
+    # least squares slope of the log-log points, i.e. the empirical exponent
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(elapsed, 1e-9)) for elapsed in times]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def _cycle_game(width: int, height: int, length: int, fruit_gap: Optional[int] = None) -> GameState:
+    # a snake lying on the hamiltonian cycle, head first, with the fruit fruit_gap cells ahead along
+    # it, half a lap by default. the board is built here so that timing the first move does not include it.
+    order = hamilton_cycle(width, height)
+    board = Board(width, height)
+    snake = tuple(board.position(cell) for cell in reversed(order[:length]))
+    fruit = board.position(order[(length - 1 + (fruit_gap or width * height // 2)) % len(order)])
+    direction = DIRECTIONS[board.direction(order[length - 2], order[length - 1])]
+    return GameState(snake, fruit, direction, 0, width + 2, height + 2, Board.from_snake(snake, width, height))
+
+
+def _assert_grows_at_most(sizes: Sequence[int], times: Sequence[float], exponent: float, margin: float = MARGIN):
+    slope = _slope(sizes, times)
+    assert slope < exponent + margin, f"time grows like size^{slope:.2f}, expected at most size^{exponent}: {list(zip(sizes, times))}"
+
+
+@pytest.mark.slow
+def test_a_star_search_is_linear_in_the_board():
+    sides = (16, 32, 64, 128)
+    times = []
+    for side in sides:
+        game = GameState(((1, 1),), (side, side), "KEY_RIGHT", 0, side + 2, side + 2)
+        a_star_search(game, (1, 1), (side, side))
+        times.append(_best(lambda: None, lambda _: a_star_search(game, (1, 1), (side, side))))
+    _assert_grows_at_most([side * side for side in sides], times, 1)
+
+
+def test_count_reachable_cells_is_linear_in_the_board():
+    sides = (16, 32, 64, 128)
+    times = []
+    for side in sides:
+        game = GameState(((1, 1),), (side, side), "KEY_RIGHT", 0, side + 2, side + 2)
+        count_reachable_cells(game, (2, 1))
+        times.append(_best(lambda: None, lambda _: count_reachable_cells(game, (2, 1))))
+    _assert_grows_at_most([side * side for side in sides], times, 1, WIDE_MARGIN)
+
+
+def _play(game: GameState, steps: int):
+    for _ in range(steps):
+        game = update_game_state(game, solver._hamilton_direction)
+
+
+@pytest.mark.slow
+def test_update_game_state_is_constant_in_the_board():
+    sides = (16, 32, 64, 128)
+    times = []
+    for side in sides:
+        _play(_cycle_game(side, side, 8), 10)
+        times.append(_best(lambda: _cycle_game(side, side, 8), lambda game: _play(game, 200)))
+    _assert_grows_at_most([side * side for side in sides], times, 0)
+
+
+def test_update_game_state_is_constant_in_the_snake():
+    lengths = (64, 256, 1024, 4096)
+    times = []
+    for length in lengths:
+        times.append(_best(lambda: update_game_state(_cycle_game(128, 128, length), solver._hamilton_direction), lambda game: _play(game, 200)))
+    _assert_grows_at_most(lengths, times, 0, WIDE_MARGIN)
+
+
+def _path(game: GameState) -> Tuple[Tuple[int, int], ...]:
+    return tuple(a_star_search(game, game.snake[0], game.fruit))
+
+
+@pytest.mark.slow
+def test_simulate_path_is_constant_in_the_board():
+    # a short path to a fruit just ahead, so the look-ahead costs O(path + length) whatever the board
+    sides = (16, 32, 64, 128)
+    times = []
+    for side in sides:
+        game = _cycle_game(side, side, 8, fruit_gap=6)
+        path = _path(game)
+        solver._simulate_path(game, path)
+        times.append(_best(lambda: None, lambda _: solver._simulate_path(game, path)))
+    _assert_grows_at_most([side * side for side in sides], times, 0)
+
+
+def test_simulate_path_is_linear_in_the_snake():
+    lengths = (64, 256, 1024, 4096)
+    times = []
+    for length in lengths:
+        game = _cycle_game(128, 128, length, fruit_gap=6)
+        path = _path(game)
+        solver._simulate_path(game, path)
+        times.append(_best(lambda: None, lambda _: solver._simulate_path(game, path)))
+    _assert_grows_at_most(lengths, times, 1, WIDE_MARGIN)
+
+
+@pytest.mark.slow
+def test_hamilton_successor_map_is_linear_in_the_board():
+    sides = (16, 32, 64, 128)
+    times = []
+    for side in sides:
+        hamilton_cycle(side, side)
+        times.append(_best(solver._hamilton_successor_map.cache_clear, lambda _: solver._hamilton_successor_map(side, side)))
+    _assert_grows_at_most([side * side for side in sides], times, 1)
@@ -0,0 +1,121 @@
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_headless_import_skips_the_terminal_stack():
+    src = Path(__file__).parent.parent / "src"
+    code = "import sys, snake; print(sorted({'blessed', 'multiprocessing', 'tempfile'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=src, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_seeded_runs_do_not_depend_on_the_workers():
+    from snake import game_seed, run_benchmark
+
+    assert len({game_seed(seed, run) for seed in range(4) for run in range(4)}) == 16
+    assert all(0 <= game_seed(seed, 0) < 1 << 63 for seed in (0, -1, 1 << 70))
+
+    def scores(workers):
+        return sorted(run_benchmark(6, workers, 7, 8, 8, {}, max_steps=40))
+
+    assert scores(1) == scores(3) == scores(1)
+
+
+def test_a_failing_worker_fails_the_benchmark():
+    import pytest
+
+    from snake import run_benchmark
+
+    # a 7x7 board has no hamiltonian cycle, so the cycle solver raises in every worker
+    with pytest.raises(RuntimeError, match="benchmark worker") as failed:
+        list(run_benchmark(4, 2, 0, 9, 9, {}, "cycle"))
+    assert isinstance(failed.value.__cause__, ValueError) and "no hamiltonian cycle" in str(failed.value.__cause__)
+
+
+class FakeTerminal:
+    # writes cursor moves as @x,y: so that a frame reads as the list of cells it touches
+    home = clear = ""
+
+    def move_xy(self, x, y):
+        return f"@{x},{y}:"
+
+
+def test_renderer_writes_only_the_changed_cells(capsys):
+    from board import Board
+    from snake import Renderer, advance_game_state
+    from state import GameState
+
+    snake = ((3, 2), (2, 2), (1, 2))
+    game = GameState(snake, (5, 2), "KEY_RIGHT", 0, 8, 6, Board.from_snake(snake, 6, 4))
+    renderer = Renderer(FakeTerminal())
+    renderer.draw(game)
+    assert "@1,2:█" in capsys.readouterr().out
+
+    # a plain move clears the old tail and draws the new head
+    game = advance_game_state(game, "KEY_RIGHT")
+    renderer.draw(game)
+    assert capsys.readouterr().out == "@1,2: @4,2:█"
+
+    # eating keeps the tail, draws the respawned fruit and the new score
+    game = advance_game_state(game, "KEY_RIGHT", fruit=(1, 1))
+    renderer.draw(game)
+    assert capsys.readouterr().out == "@5,2:█@1,1:ó@1,0:Score: 1"
+
+    # a state that is not one move on from the last one is drawn in full
+    renderer.draw(GameState(snake, (5, 2), "KEY_RIGHT", 0, 8, 6))
+    assert capsys.readouterr().out.count("█") == 3
+
+
+def test_a_long_game_on_a_huge_board_runs_in_bounded_memory():
+    import tracemalloc
+
+    from board import DIRECTIONS, Board
+    from cycle import hamilton_cycle
+    from snake import cli_game_loop, update_game_state
+    from solver import get_next_direction_cycle
+    from state import GameState
+
+    # a 60k-cell snake on the cycle of a 300x300 board, with the fruit far ahead
+    order = hamilton_cycle(300, 300)
+    board = Board(300, 300)
+    snake = tuple(board.position(cell) for cell in reversed(order[:60000]))
+    direction = DIRECTIONS[board.direction(order[59998], order[59999])]
+    game = GameState(snake, board.position(order[80000]), direction, 0, 302, 302, Board.from_snake(snake, 300, 300))
+    game = update_game_state(game, get_next_direction_cycle)
+    del snake
+
+    tracemalloc.start()
+    final_game_state, steps = cli_game_loop(game, get_next_direction_cycle, max_steps=2000)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert steps == 2000 and len(final_game_state.snake) == 60000
+    # a copy of the body per state would take 480kB for its pointers alone
+    assert peak < 64 * 1024
+
+
+def test_cli_game_loop_ends_where_the_event_stream_does(monkeypatch):
+    import random
+
+    import snake
+    from snake import cli_game_loop, init_game_state, stream_game
+    from solver import get_next_direction_cycle
+
+    def untimed():
+        raise AssertionError("cli_game_loop timed a step")
+
+    for max_steps in (None, 50):
+        rng = random.Random(3)
+        with monkeypatch.context() as patched:
+            patched.setattr(snake.time, "perf_counter", untimed)
+            game, steps = cli_game_loop(init_game_state(8, 8, rng), get_next_direction_cycle, max_steps, rng=rng)
+        rng = random.Random(3)
+        stream = stream_game(init_game_state(8, 8, rng), get_next_direction_cycle, max_steps, rng=rng)
+        events = []
+        try:
+            while True:
+                events.append(next(stream))
+        except StopIteration as finished:
+            streamed, streamed_steps = finished.value
+        assert (tuple(game.snake), game.score, steps) == (tuple(streamed.snake), streamed.score, streamed_steps)
+        assert events[-1].step == steps and events[-1].score == game.score
@@ -0,0 +1,296 @@
+import pytest
+
+import solver
+from board import UP, Board
+from cycle import cycle_index, hamilton_cycle
+from solver import _hamilton_direction, _hamilton_successor_map, get_next_direction, get_next_direction_cycle
+from state import GameState
+from transposition import TranspositionTable
+from utils import DistanceField
+
+
+def test_hamilton_cycle_index_is_permutation():
+    index = cycle_index(6, 4)
+    assert sorted(index) == list(range(24))
+
+
+def test_hamilton_cycle_index_follows_successors():
+    index = cycle_index(4, 4)
+    successors = _hamilton_successor_map(4, 4)
+    for (x, y), (nx, ny) in successors.items():
+        cell = (x - 1) * 4 + (y - 1)
+        next_cell = (nx - 1) * 4 + (ny - 1)
+        assert index[next_cell] == (index[cell] + 1) % 16
+
+
+def test_cycle_solver_follows_cycle_when_fruit_is_close():
+    snake = ((3, 3), (2, 3), (1, 3))
+    game = GameState(snake=snake, fruit=(3, 4), direction="KEY_RIGHT", score=0, term_width=8, term_height=8)
+    assert get_next_direction_cycle(game) == _hamilton_direction(game)
+
+
+def test_cycle_solver_takes_shortcut_towards_distant_fruit():
+    # column 3 runs down the cycle, column 4 runs up it, so stepping right skips the rest of column 3
+    snake = ((3, 3), (2, 3), (1, 3))
+    game = GameState(snake=snake, fruit=(5, 4), direction="KEY_RIGHT", score=0, term_width=8, term_height=8)
+    assert _hamilton_direction(game) == "KEY_DOWN"
+    assert get_next_direction_cycle(game) == "KEY_RIGHT"
+
+
+def test_solver_follows_validated_plan(monkeypatch):
+    snake = ((4, 6), (3, 6), (2, 6))
+    board = Board.from_snake(snake, 6, 6)
+    game = GameState(snake=snake, fruit=(4, 2), direction="KEY_RIGHT", score=0, term_width=8, term_height=8, board=board)
+    assert get_next_direction(game) == "KEY_UP"
+    _, _, path = solver._plans[board]
+    assert len(path) == 5
+
+    def no_search(*args):
+        raise AssertionError("plan should have been reused")
+
+    monkeypatch.setattr(solver, "a_star_search", no_search)
+    for step in range(1, len(path) - 1):
+        head = board.position(board.step(board.cell(game.snake[0]), UP))
+        board.advance(board.cell(head), grow=False)
+        game = GameState((head,) + game.snake[:-1], game.fruit, "KEY_UP", 0, 8, 8, board)
+        assert game.snake[0] == path[step]
+        assert get_next_direction(game) == "KEY_UP"
+
+
+def test_solver_drops_plan_when_fruit_moves():
+    snake = ((4, 6), (3, 6), (2, 6))
+    board = Board.from_snake(snake, 6, 6)
+    game = GameState(snake=snake, fruit=(4, 2), direction="KEY_RIGHT", score=0, term_width=8, term_height=8, board=board)
+    get_next_direction(game)
+    assert board in solver._plans
+    board.advance(board.cell((4, 5)), grow=False)
+    moved = GameState(((4, 5),) + snake[:-1], (6, 6), "KEY_UP", 0, 8, 8, board)
+    assert solver._planned_direction(moved) is None
+    assert board not in solver._plans
+
+
+def test_solver_reuses_decisions_from_transposition_table(monkeypatch):
+    snake = ((4, 6), (3, 6), (2, 6))
+    monkeypatch.setattr(solver, "transpositions", TranspositionTable(16))
+    first = Board.from_snake(snake, 6, 6)
+    direction = get_next_direction(GameState(snake, (4, 2), "KEY_RIGHT", 0, 8, 8, first))
+
+    def no_search(*args):
+        raise AssertionError("decision should have come from the table")
+
+    monkeypatch.setattr(solver, "a_star_search", no_search)
+    second = Board.from_snake(snake, 6, 6)
+    assert get_next_direction(GameState(snake, (4, 2), "KEY_RIGHT", 0, 8, 8, second)) == direction
+    assert solver._plans[second][2] == solver._plans[first][2]
+    assert solver.transpositions.stats()["hits"] == 1
+
+
+def test_simulate_path_builds_final_body(monkeypatch):
+    monkeypatch.setattr(solver, "_follows_cycle", lambda game: True)
+    # a square snake, the head sits next to its tail
+    snake = ((2, 1), (2, 2), (1, 2), (1, 1))
+    game = GameState(snake, (4, 4), "KEY_UP", 0, 6, 6)
+
+    # a cell is blocked until the tail has left it, including the current tail cell
+    assert solver._simulate_path(game, [(2, 1), (1, 1)]) is None
+    assert solver._simulate_path(game, [(2, 1), (3, 1), (3, 2), (2, 2)]) is None
+    state = solver._simulate_path(game, [(2, 1), (3, 1), (3, 2), (3, 3), (2, 3), (2, 2)])
+    assert state.snake == ((2, 2), (2, 3), (3, 3), (3, 2))
+
+    # eating keeps the tail where it is
+    board = Board.from_snake(snake, 4, 4)
+    game = GameState(snake, (3, 3), "KEY_UP", 0, 6, 6, board)
+    state = solver._simulate_path(game, [(2, 1), (3, 1), (3, 2), (3, 3)])
+    assert state.snake == ((3, 3), (3, 2), (3, 1), (2, 1), (2, 2))
+    assert state.score == 1 and state.board is None
+    # the look-ahead ran on the live board and left it as it was
+    assert board.describes(snake) and board.moves == 0 and board.journal is None
+    assert sorted(board.free[: board.free_count]) == [cell for cell in range(board.size) if not board.occupied[cell]]
+
+
+def test_warm_up_builds_the_tables_of_the_first_move():
+    import cycle
+    from utils import a_star_engine
+
+    solver.warm_up(12, 14)
+    built = cycle._tables.cache_info().currsize
+    engine = a_star_engine(12, 14)
+    get_next_direction(GameState(((6, 7), (5, 7), (4, 7)), (2, 2), "KEY_RIGHT", 0, 14, 16))
+    assert cycle._tables.cache_info().currsize == built
+    assert a_star_engine(12, 14) is engine
+
+
+def test_gradient_solver_wins_and_repairs_its_field(monkeypatch):
+    import random
+
+    from snake import cli_game_loop, init_game_state
+
+    built = []
+    monkeypatch.setattr(solver, "DistanceField", lambda *args: built.append(args) or DistanceField(*args))
+    rng = random.Random(2)
+    final_game_state, steps = cli_game_loop(init_game_state(10, 8, rng), solver.get_next_direction_gradient, rng=rng)
+    assert len(final_game_state.snake) == 8 * 6
+    # rebuilt once per fruit at most, every other decision repaired the field
+    assert len(built) <= final_game_state.score + 1
+
+
+def test_anytime_solver_follows_the_cycle_once_the_budget_is_spent(monkeypatch):
+    import utils
+
+    monkeypatch.setattr(utils, "CHECK_EVERY", 1)
+    game = GameState(((16, 15), (15, 15), (14, 15)), (2, 2), "KEY_RIGHT", 0, 32, 32)
+    monkeypatch.setattr(solver, "move_budget", solver.MoveBudget(1e-9))
+    direction = solver.get_next_direction_anytime(game)
+    assert solver.take_branch() == "budget"
+    assert direction == _hamilton_direction(game)
+    assert solver.move_budget.stats()["interrupted"] == 1
+
+    monkeypatch.setattr(solver, "move_budget", solver.MoveBudget(60))
+    assert solver.get_next_direction_anytime(game) == get_next_direction(game)
+    assert solver.move_budget.stats() == {"moves": 1, "interrupted": 0, "exceeded": 0, "slowest": solver.move_budget.slowest}
+
+
+def test_anytime_solver_keeps_to_its_plan_once_the_budget_is_spent(monkeypatch):
+    import random
+
+    import utils
+    from snake import init_game_state, update_game_state
+
+    # play until the snake is half-way along a plan with its body off the cycle, where following
+    # the cycle is not safe
+    rng = random.Random(0)
+    game = init_game_state(12, 12, rng)
+    while not (game.board in solver._plans and not solver._in_cycle_order(game.board, cycle_index(10, 10))):
+        game = update_game_state(game, get_next_direction, rng)
+    planned = solver._planned_direction(game)
+    assert planned is not None
+
+    def spent():
+        raise utils.DeadlineExceeded
+
+    monkeypatch.setattr(solver, "check_deadline", spent)
+    monkeypatch.setattr(utils, "check_deadline", spent)
+    monkeypatch.setattr(solver, "move_budget", solver.MoveBudget(60))
+    assert solver.get_next_direction_anytime(game) == planned
+    assert solver.take_branch() == "plan"
+
+
+def test_anytime_solver_survives_deadlines_at_any_point(monkeypatch):
+    import random
+
+    import utils
+    from snake import init_game_state, update_game_state
+
+    chaos = random.Random(0)
+
+    def flaky():
+        if chaos.random() < 0.1:
+            raise utils.DeadlineExceeded
+
+    monkeypatch.setattr(solver, "check_deadline", flaky)
+    monkeypatch.setattr(utils, "check_deadline", flaky)
+    monkeypatch.setattr(solver, "move_budget", solver.MoveBudget(60))
+    for seed in range(20):
+        rng = random.Random(seed)
+        game = init_game_state(12, 12, rng)
+        while (next_game := update_game_state(game, solver.get_next_direction_anytime, rng)) is not None:
+            game = next_game
+        assert len(game.snake) == 10 * 10, seed
+
+
+def test_anytime_solver_keeps_each_move_close_to_a_tight_budget(monkeypatch):
+    import time
+
+    from board import DIRECTIONS
+    from cycle import hamilton_cycle
+    from snake import update_game_state
+
+    # a long snake on the cycle with the fruit just ahead: the search is far too small to reach a
+    # periodic check, the look-ahead walks the whole body. cpu time of this thread is measured, as
+    # the budget is wall-clock time and a busy machine would only make the solver give up sooner.
+    width = height = 128
+    order = hamilton_cycle(width, height)
+    board = Board(width, height)
+    for cell in order[:8000]:
+        board.push_head(cell)
+    fruit = board.position(order[8005])
+    game = GameState(board.view(), fruit, DIRECTIONS[board.direction(order[7998], order[7999])], 0, width + 2, height + 2, board)
+    solver.warm_up(width, height)
+    budget = solver.MoveBudget(0.001)
+    monkeypatch.setattr(solver, "move_budget", budget)
+
+    latencies = []
+
+    def timed(game):
+        start = time.thread_time()
+        direction = solver.get_next_direction_anytime(game)
+        latencies.append(time.thread_time() - start)
+        return direction
+
+    for _ in range(20):
+        game = update_game_state(game, timed)
+    assert budget.interrupted > 0
+    assert max(latencies) < 5 * budget.seconds, latencies
+
+
+def test_dynamic_solver_wins_in_fewer_steps_than_the_cycle_solver():
+    import random
+
+    from snake import init_game_state, update_game_state
+
+    def play(game_solver, seed):
+        rng = random.Random(seed)
+        game = init_game_state(12, 10, rng)
+        steps = 0
+        while (next_game := update_game_state(game, game_solver, rng)) is not None:
+            game, steps = next_game, steps + 1
+            if game_solver is solver.get_next_direction_dynamic:
+                # the spliced cycle is still hamiltonian, and the body lies along it in order
+                cycle = solver._cycles[game.board][0]
+                cell = 0
+                for position in range(game.board.size):
+                    cell = cycle.successors[cell]
+                    assert cycle.index[cell] == (cycle.index[0] + position + 1) % game.board.size
+                    assert game.board.direction(cell, cycle.successors[cell]) is not None
+                assert cell == 0
+                tail = cycle.index[game.board.tail]
+                gaps = [(cycle.index[game.board.cell(position)] - tail) % game.board.size for position in reversed(game.snake)]
+                assert gaps == sorted(set(gaps))
+        assert len(game.snake) == 10 * 8
+        return steps
+
+    for seed in range(3):
+        assert play(solver.get_next_direction_dynamic, seed) < play(get_next_direction_cycle, seed)
+
+
+def test_dynamic_solver_beats_the_cycle_solver_on_a_larger_board():
+    import random
+
+    from snake import init_game_state, update_game_state
+
+    def play(game_solver, seed, size, max_steps=None):
+        rng = random.Random(seed)
+        game = init_game_state(size, size, rng)
+        steps = 0
+        while steps != max_steps and (next_game := update_game_state(game, game_solver, rng)) is not None:
+            game, steps = next_game, steps + 1
+        return game, steps
+
+    # a 20x20 board is won in about 27000 steps along the cycle
+    cycle_game, cycle_steps = play(get_next_direction_cycle, 0, 22)
+    dynamic_game, dynamic_steps = play(solver.get_next_direction_dynamic, 0, 22)
+    assert len(cycle_game.snake) == len(dynamic_game.snake) == 20 * 20
+    assert dynamic_steps < 0.75 * cycle_steps
+
+    # with a body far shorter than the board there is nothing to splice, it plays like the cycle solver
+    assert play(solver.get_next_direction_dynamic, 0, 102, 2000)[0].snake == play(get_next_direction_cycle, 0, 102, 2000)[0].snake
+
+
+def test_dynamic_solver_refuses_a_body_off_the_cycle():
+    board = Board(6, 6)
+    order = [board.position(cell) for cell in hamilton_cycle(6, 6)]
+    game = GameState(tuple(order[:3]), order[10], "KEY_RIGHT", 0, 8, 8)  # head first, against the cycle
+    with pytest.raises(ValueError):
+        solver.get_next_direction_dynamic(game)
+    game = GameState(tuple(reversed(order[:3])), order[10], "KEY_RIGHT", 0, 8, 8)
+    assert solver.get_next_direction_dynamic(game) is not None
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+import solver
+from solver import get_next_direction_cycle, load_solver
+from tournament import format_ranking, run_tournament
+
+
+def sleepy(game):
+    time.sleep(0.5)
+    return get_next_direction_cycle(game)
+
+
+def broken(game):
+    raise RuntimeError("broken plug-in")
+
+
+def unhashable(game):
+    return ["KEY_UP"]
+
+
+def spin(game):
+    while True:
+        pass
+
+
+def crowded(game):
+    # logs the process every move is decided in
+    with open(os.environ["CROWDED_LOG"], "a") as log:
+        log.write(f"{os.getpid()}\n")
+    time.sleep(0.01)
+    return get_next_direction_cycle(game)
+
+
+def test_load_solver():
+    assert load_solver("cycle") is solver.SOLVERS["cycle"]
+    assert load_solver("test_tournament:sleepy") is sleepy
+    with pytest.raises(ValueError):
+        load_solver("nope")
+
+
+def test_tournament_ranks_and_disqualifies():
+    ranking = asyncio.run(run_tournament(["test_tournament:sleepy", "hamilton", "cycle"], range(3), 8, 0.05, 2))
+    assert [entry.name for entry in ranking] == ["cycle", "hamilton", "test_tournament:sleepy"]
+    cycle, hamilton, sleepy_entry = ranking
+    assert cycle.wins == cycle.games == 3
+    assert hamilton.wins == 3 and hamilton.average_steps > cycle.average_steps
+    assert sleepy_entry.disqualified and "disqualified" in format_ranking(ranking)
+
+
+def test_a_failing_solver_only_loses_its_own_entry():
+    ranking = asyncio.run(run_tournament(["test_tournament:broken", "test_tournament:unhashable", "cycle"], range(2), 8, 1, 2))
+    assert [entry.name for entry in ranking][0] == "cycle" and ranking[0].wins == 2
+    assert all("raised" in entry.disqualified for entry in ranking[1:])
+    assert "broken plug-in" in format_ranking(ranking)
+
+
+def test_a_solver_plays_its_games_concurrently(tmp_path, monkeypatch):
+    monkeypatch.setenv("CROWDED_LOG", str(tmp_path / "pids"))
+    ranking = asyncio.run(run_tournament(["test_tournament:crowded"], range(4), 6, 1, 4))
+    assert ranking[0].wins == 4
+    assert len(set((tmp_path / "pids").read_text().split())) > 1
+
+
+def test_a_solver_that_never_returns_is_stopped():
+    # the spinning solver is terminated, so it does not slow the others past the budget
+    ranking = asyncio.run(run_tournament(["test_tournament:spin", "cycle", "astar"], range(6), 8, 0.1, 2))
+    assert [entry.name for entry in ranking][2] == "test_tournament:spin"
+    assert "took longer" in ranking[2].disqualified
+    assert all(entry.disqualified is None and entry.wins == 6 for entry in ranking[:2])
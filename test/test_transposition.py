@@ -0,0 +1,42 @@
+import pytest
+
+from transposition import TranspositionTable, format_stats
+
+
+def test_lru_keeps_recently_used_entries():
+    table = TranspositionTable(2, "lru")
+    table.put(1, "a")
+    table.put(2, "b")
+    assert table.get(1) == "a"
+    table.put(3, "c")
+    assert table.get(2) is None
+    assert table.get(1) == "a"
+    assert table.stats()["evictions"] == 1
+
+
+def test_fifo_drops_oldest_entry():
+    table = TranspositionTable(2, "fifo")
+    table.put(1, "a")
+    table.put(2, "b")
+    assert table.get(1) == "a"
+    table.put(3, "c")
+    assert table.get(1) is None
+    assert table.get(2) == "b"
+
+
+def test_stats_track_hits_and_memory():
+    table = TranspositionTable(10)
+    table.put(7, ("KEY_UP", ((1, 1), (1, 2))))
+    table.get(7)
+    table.get(8)
+    stats = table.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["bytes"] > 0
+    assert "1/2 hits (50.0%)" in format_stats([stats])
+
+
+def test_table_rejects_bad_configuration():
+    with pytest.raises(ValueError):
+        TranspositionTable(0)
+    with pytest.raises(ValueError):
+        TranspositionTable(10, "random")
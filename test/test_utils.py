@@ -4,8 +4,14 @@
 #     "pytest>=8.0.0",
 # ]
 # ///
+import random
+import time
+
+import pytest
+
+from board import Board
 from state import GameState
-from utils import a_star_search, count_reachable_cells, dist
+from utils import AStar, DeadlineExceeded, DistanceField, a_star_search, count_reachable_cells, dist, set_deadline
 
 
 def test_dist():
@@ -144,3 +150,77 @@ def test_a_star_corner_to_corner():
     path = a_star_search(game, (1, 1), (5, 5))
     assert path is not None
     assert len(path) == 9
+
+
+def test_a_star_engine_reuse():
+    snake = ((2, 2), (3, 2), (4, 2), (4, 3))
+    game = GameState(snake=snake, fruit=(5, 2), direction="KEY_RIGHT", score=3, term_width=8, term_height=8)
+
+    first = a_star_search(game, (2, 2), (5, 2))
+    a_star_search(game, (1, 1), (6, 6))
+    assert a_star_search(game, (2, 2), (5, 2)) == first
+
+
+def test_a_star_engine_cells():
+    engine = AStar(3, 2)
+    occupied = bytearray(6)
+    occupied[2] = 1  # (2, 1)
+    occupied[3] = 1  # (2, 2)
+
+    assert engine.search(occupied, 0, 4, tail=-1) is None
+    assert engine.search(occupied, 0, 4, tail=3) == [0, 1, 3, 5, 4]
+
+
+def test_count_reachable_cells_limit():
+    game = GameState(snake=((3, 3),), fruit=(5, 5), direction="KEY_RIGHT", score=0, term_width=7, term_height=7)
+
+    assert count_reachable_cells(game, (3, 3), limit=1) == 1
+    assert count_reachable_cells(game, (3, 3), limit=10) == 10
+    assert count_reachable_cells(game, (3, 3), limit=100) == 25
+
+
+def test_count_reachable_cells_timed():
+    # the wall splits the board, but its tail end leaves after one move and opens the gap at (3, 1)
+    snake = ((3, 5), (3, 4), (3, 3), (3, 2), (3, 1))
+
+    game = GameState(snake=snake, fruit=(5, 5), direction="KEY_DOWN", score=4, term_width=7, term_height=7)
+
+    assert count_reachable_cells(game, (1, 1)) == 10
+    assert count_reachable_cells(game, (1, 1), timed=True) > 10
+
+
+def test_engine_grids_match_cell_ids():
+    engine = AStar(5, 3)
+    assert list(engine.columns) == [cell // 3 for cell in range(15)]
+    assert list(engine.rows) == [cell % 3 for cell in range(15)]
+
+
+def test_distance_field_repairs_match_a_fresh_field():
+    rng = random.Random(3)
+    board = Board.from_snake(((3, 3), (2, 3), (1, 3)), 7, 6)
+    field = DistanceField(board, board.cell((6, 5)))
+    for _ in range(200):
+        moves = [cell for cell in board.neighbours[board.head * 4 : board.head * 4 + 4] if cell != board.head and not board.occupied[cell] and cell != field.target]
+        if not moves:
+            break
+        cell, grow, tail = rng.choice(moves), rng.random() < 0.3, board.tail
+        board.advance(cell, grow)
+        if not grow:
+            field.free(tail)
+        field.occupy(cell)
+        assert field.distance == DistanceField(board, field.target).distance
+
+
+def test_searches_give_up_after_the_deadline():
+    game = GameState(snake=((1, 1),), fruit=(30, 30), direction="KEY_RIGHT", score=0, term_width=32, term_height=32)
+    set_deadline(time.perf_counter() - 1)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            a_star_search(game, (1, 1), (30, 30))
+        with pytest.raises(DeadlineExceeded):
+            count_reachable_cells(game, (2, 1))
+        with pytest.raises(DeadlineExceeded):
+            count_reachable_cells(game, (2, 1), limit=10)  # too small to reach a periodic check, caught on entry
+    finally:
+        set_deadline(None)
+    assert len(a_star_search(game, (1, 1), (30, 30))) == 59